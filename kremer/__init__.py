@@ -0,0 +1,34 @@
+"""Motor numérico del modelo de Kremer (1993), independiente de Streamlit.
+
+Los nombres de uso frecuente se reexportan de forma perezosa: ``import kremer``
+no carga ningún submódulo, y ``kremer.simulate_batch`` importa
+``kremer.engine`` recién la primera vez que se usa.
+"""
+import importlib
+
+_EXPORTS = {
+    "table_i": "kremer.data",
+    "table_i_frame": "kremer.data",
+    "kremer_rate": "kremer.engine",
+    "simulate_batch": "kremer.engine",
+    "analytic_batch": "kremer.engine",
+    "simulate_generalized": "kremer.engine",
+    "simulate_adaptive": "kremer.adaptive",
+    "simulate_regions": "kremer.regions",
+    "run_ensemble": "kremer.ensemble",
+    "calibrate": "kremer.calibration",
+    "run_batch": "kremer.batch",
+    "export_scenario": "kremer.export",
+    "write_ensemble": "kremer.export",
+    "simulate_stochastic": "kremer.stochastic",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'kremer' has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,302 @@
+"""Barridas de escenarios por lotes, sin Streamlit ni navegador.
+
+El archivo de escenarios es un JSON con una grilla (producto cartesiano) o
+una lista explícita, o un CSV con columnas ``g``, ``alpha``, ``P0`` y
+opcionalmente ``transition``::
+
+    {
+      "years": {"start": -10000, "stop": 2000, "step": 10},
+      "grid": {
+        "g": {"start": 0.001, "stop": 0.02, "num": 1000, "scale": "log"},
+        "alpha": [0.6, 0.7, 0.8],
+        "P0": {"start": 0.001, "stop": 0.01, "num": 100},
+        "transition": [false, true]
+      }
+    }
+
+    python -m kremer.batch escenarios.json -o barrida/ --processes 32
+    python -m kremer.batch escenarios.json -o barrida/ --resume
+
+Los escenarios se numeran en orden fijo y se integran por bloques de
+``chunk_size`` en un pool de procesos. Cada bloque se escribe en su propio
+archivo (``chunk-000042.parquet`` o ``.npz``) apenas termina, con un archivo
+temporal renombrado al final: un bloque está en disco completo o no está.
+Retomar una corrida interrumpida solo integra los bloques que faltan. La
+integración y la transición demográfica son las del motor de Euler de la
+app (``simulate_batch`` y ``apply_demographic_transition``).
+
+Cada fila guarda los parámetros, si la trayectoria explotó, el año en que
+se detuvo y la población final; con ``--trajectories`` se agrega la
+trayectoria completa en float32.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+
+from kremer.engine import apply_demographic_transition, simulate_batch
+
+DEFAULT_YEARS = {"start": -10000, "stop": 2000, "step": 10}
+CHUNK_SIZE = 10_000
+TRANSITION_START = 1950
+PARAMETERS = ("g", "alpha", "P0", "transition")
+FORMATS = ("parquet", "npz")
+RUN_FILE = "run.json"
+
+
+def _axis(values):
+    """Valores de un eje de la grilla: lista, escalar o ``{start, stop, num, scale}``."""
+    if isinstance(values, dict):
+        if values.get("scale", "linear") == "log":
+            return np.geomspace(values["start"], values["stop"], values["num"])
+        return np.linspace(values["start"], values["stop"], values["num"])
+    return np.atleast_1d(np.asarray(values, dtype=float))
+
+
+class ScenarioSet:
+    """Escenarios numerados 0..n-1; los de una grilla se generan por índice, sin materializarlos."""
+
+    def __init__(self, years, axes=None, table=None):
+        self.years = years
+        self.axes = axes
+        self.table = table
+        if axes is not None:
+            self.shape = tuple(axes[name].size for name in PARAMETERS)
+            self.size = int(np.prod(self.shape))
+        else:
+            self.size = table["g"].size
+
+    def slice(self, lo, hi):
+        """Parámetros de los escenarios ``lo..hi-1`` como arrays."""
+        if self.axes is None:
+            return {name: self.table[name][lo:hi] for name in PARAMETERS}
+        idx = np.unravel_index(np.arange(lo, hi), self.shape)
+        return {name: self.axes[name][i] for name, i in zip(PARAMETERS, idx)}
+
+
+def _table(rows):
+    columns = {
+        "g": [float(row["g"]) for row in rows],
+        "alpha": [float(row["alpha"]) for row in rows],
+        "P0": [float(row["P0"]) for row in rows],
+        # En CSV la columna llega como texto ("true", "1", ...)
+        "transition": [str(row.get("transition", False)).strip().lower() in ("1", "true", "yes", "sí", "si")
+                       for row in rows],
+    }
+    table = {name: np.asarray(values, dtype=float) for name, values in columns.items()}
+    table["transition"] = table["transition"].astype(bool)
+    return table
+
+
+def load_scenarios(path):
+    """Lee un archivo de escenarios (JSON con ``grid`` o ``scenarios``, o CSV)."""
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            spec = {"scenarios": list(csv.DictReader(f))}
+    else:
+        spec = json.loads(path.read_text(encoding="utf-8"))
+    return scenarios_from_spec(spec), spec
+
+
+def scenarios_from_spec(spec):
+    years_spec = {**DEFAULT_YEARS, **spec.get("years", {})}
+    years = np.arange(years_spec["start"], years_spec["stop"], years_spec["step"], dtype=float)
+    if "grid" in spec:
+        grid = spec["grid"]
+        missing = [name for name in ("g", "alpha", "P0") if name not in grid]
+        if missing:
+            raise ValueError(f"La grilla no define {', '.join(missing)}.")
+        axes = {name: _axis(grid[name]) for name in ("g", "alpha", "P0")}
+        axes["transition"] = np.atleast_1d(np.asarray(grid.get("transition", [False]), dtype=bool))
+        return ScenarioSet(years, axes=axes)
+    if "scenarios" in spec:
+        return ScenarioSet(years, table=_table(spec["scenarios"]))
+    raise ValueError("El archivo de escenarios necesita 'grid' o 'scenarios'.")
+
+
+def run_chunk(params, years):
+    """Integra un bloque de escenarios; devuelve las columnas de salida."""
+    P, stop = simulate_batch(params["P0"], params["g"], params["alpha"], years)
+    ok = params["transition"] & (stop < 0)
+    if ok.any():
+        P[ok] = apply_demographic_transition(P[ok], years, start=TRANSITION_START)
+    return {
+        **params,
+        "exploded": stop >= 0,
+        "stop_year": np.where(stop >= 0, years[np.maximum(stop, 0)], np.nan),
+        "P_final": P[:, -1],
+        "trajectory": P,
+    }
+
+
+def _write_parquet(path, columns):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    arrays = {name: values for name, values in columns.items() if name != "trajectory"}
+    if "trajectory" in columns:
+        P = columns["trajectory"]
+        arrays["trajectory"] = pa.FixedSizeListArray.from_arrays(pa.array(P.ravel()), P.shape[1])
+    pq.write_table(pa.table(arrays), path)
+
+
+def _chunk_task(args):
+    index, lo, params, years, out_dir, fmt, trajectories = args
+    hi = lo + params["g"].size
+    columns = {"scenario": np.arange(lo, hi), **run_chunk(params, years)}
+    if trajectories:
+        # Las trayectorias que explotaron superan el rango de float32 y quedan como inf
+        with np.errstate(over="ignore"):
+            columns["trajectory"] = columns["trajectory"].astype(np.float32)
+    else:
+        del columns["trajectory"]
+
+    final = Path(out_dir) / f"chunk-{index:06d}.{fmt}"
+    tmp = final.with_name(f".{final.name}.{os.getpid()}.tmp")
+    if fmt == "parquet":
+        _write_parquet(tmp, columns)
+    else:
+        with open(tmp, "wb") as f:
+            np.savez(f, **columns)
+    os.replace(tmp, final)
+    return index, hi - lo, int(columns["exploded"].sum())
+
+
+def _spec_hash(spec):
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def run_batch(spec, out_dir, fmt="parquet", chunk_size=CHUNK_SIZE, processes=None, trajectories=False,
+              resume=False, log=None):
+    """Corre la barrida ``spec`` y escribe un archivo por bloque en ``out_dir``.
+
+    Con ``resume`` retoma una corrida previa del mismo ``spec`` (los bloques
+    ya escritos no se recalculan). Devuelve un dict con los escenarios y
+    bloques corridos y omitidos.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato desconocido: {fmt!r} (use {' o '.join(FORMATS)}).")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise RuntimeError("La salida Parquet requiere pyarrow; instálelo o use --format npz.") from None
+
+    scenarios = scenarios_from_spec(spec)
+    out_dir = Path(out_dir)
+    run = {"spec_hash": _spec_hash(spec), "format": fmt, "chunk_size": chunk_size,
+           "trajectories": trajectories, "n_scenarios": scenarios.size,
+           "years": [float(scenarios.years[0]), float(scenarios.years[-1]), int(scenarios.years.size)],
+           # Una lista explícita puede tener millones de filas: queda solo su hash
+           "grid": spec.get("grid")}
+    run_path = out_dir / RUN_FILE
+    if run_path.exists():
+        if not resume:
+            raise FileExistsError(f"{out_dir} ya tiene una corrida; use --resume o otro directorio.")
+        if json.loads(run_path.read_text(encoding="utf-8")) != json.loads(json.dumps(run)):
+            raise ValueError(f"La corrida en {out_dir} usa otros escenarios u opciones; no se puede retomar.")
+    else:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        run_path.write_text(json.dumps(run, indent=2), encoding="utf-8")
+
+    bounds = [(i, lo, min(lo + chunk_size, scenarios.size))
+              for i, lo in enumerate(range(0, scenarios.size, chunk_size))]
+    bounds = [b for b in bounds if not (out_dir / f"chunk-{b[0]:06d}.{fmt}").exists()]
+    skipped = -(-scenarios.size // chunk_size) - len(bounds)
+    if log is not None and skipped:
+        log(f"Retomando: {skipped} bloques ya estaban escritos")
+    # Los parámetros de cada bloque se generan al enviarlo, no todos de antemano
+    pending = ((i, lo, scenarios.slice(lo, hi), scenarios.years, str(out_dir), fmt, trajectories)
+               for i, lo, hi in bounds)
+
+    start, done, exploded = time.perf_counter(), 0, 0
+
+    def report(result):
+        nonlocal done, exploded
+        done += result[1]
+        exploded += result[2]
+        if log is not None:
+            rate = done / max(time.perf_counter() - start, 1e-9)
+            log(f"bloque {result[0]:6d}  {done:,} escenarios  {rate:,.0f}/s")
+
+    if processes and processes > 1 and len(bounds) > 1:
+        # Como mucho dos bloques en vuelo por proceso: la cola no crece con la barrida
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            in_flight = set()
+            for task in pending:
+                in_flight.add(pool.submit(_chunk_task, task))
+                if len(in_flight) >= 2 * processes:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        report(future.result())
+            for future in in_flight:
+                report(future.result())
+    else:
+        for task in pending:
+            report(_chunk_task(task))
+
+    return {"scenarios": done, "exploded": exploded, "chunks": len(bounds), "skipped_chunks": skipped,
+            "seconds": time.perf_counter() - start}
+
+
+def read_results(out_dir, columns=None):
+    """Junta los bloques escritos de una corrida en un dict de arrays."""
+    out_dir = Path(out_dir)
+    run = json.loads((out_dir / RUN_FILE).read_text(encoding="utf-8"))
+    paths = sorted(out_dir.glob(f"chunk-*.{run['format']}"))
+    parts = []
+    for path in paths:
+        if run["format"] == "parquet":
+            import pyarrow.parquet as pq
+
+            table = pq.read_table(path, columns=columns)
+            part = {}
+            for name in table.column_names:
+                column = table.column(name).combine_chunks()
+                if name == "trajectory":
+                    part[name] = column.flatten().to_numpy().reshape(len(column), -1)
+                else:
+                    part[name] = column.to_numpy(zero_copy_only=False)
+        else:
+            with np.load(path) as data:
+                part = {name: data[name] for name in (columns or data.files)}
+        parts.append(part)
+    if not parts:
+        return {}
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Barrida de escenarios del modelo de Kremer por lotes.")
+    parser.add_argument("scenarios", help="archivo de escenarios (JSON con grid/scenarios, o CSV)")
+    parser.add_argument("-o", "--output", required=True, help="directorio de resultados")
+    parser.add_argument("--format", choices=FORMATS, default="parquet")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="escenarios por bloque")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="procesos del pool")
+    parser.add_argument("--trajectories", action="store_true", help="guarda la trayectoria completa (float32)")
+    parser.add_argument("--resume", action="store_true", help="retoma una corrida interrumpida")
+    args = parser.parse_args(argv)
+
+    scenarios, spec = load_scenarios(args.scenarios)
+    print(f"{scenarios.size:,} escenarios × {scenarios.years.size} años")
+    try:
+        summary = run_batch(spec, args.output, args.format, args.chunk_size, args.processes, args.trajectories,
+                            args.resume, log=print)
+    except (FileExistsError, ValueError, RuntimeError) as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    print(f"{summary['scenarios']:,} escenarios en {summary['seconds']:.1f} s "
+          f"({summary['exploded']:,} explotaron; {summary['skipped_chunks']} bloques retomados)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,336 @@
+"""Benchmarks de los cálculos de la app, sin Streamlit.
+
+Cubren la integración global (los cuatro motores de ``kremer_sim.py``), las
+regiones (también en modo estocástico), las barridas de escenarios (10^3 y
+10^5) y de sensibilidad, los horizontes largos, la regresión del anexo 3 y la
+construcción de figuras::
+
+    python -m kremer.bench                              # todo, a bench.json
+    python -m kremer.bench --quick                      # sin 10^5 ni horizontes largos
+    python -m kremer.bench -k regression -o reg.json    # solo lo que contiene "regression"
+    python -m kremer.bench --compare base.json          # compara contra otra corrida
+
+Cada benchmark separa la preparación (fuera de la medición) de la llamada
+medida; se informa el mínimo, la mediana y la media de ``repeat`` corridas.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+# Valores por defecto de los controles de la app
+G, ALPHA, P0 = 0.005, 0.7, 0.004
+YEARS_SIM = np.arange(-10000, 2000, 10)
+YEARS_LONG = np.arange(-1_000_000, 2000, 10)
+SLOWDOWN_THRESHOLD = 1.10
+
+BENCHMARKS = []
+
+
+def benchmark(group, scale, repeat=5, slow=False):
+    """Registra ``setup``: devuelve la función sin argumentos que se mide."""
+    def register(setup):
+        BENCHMARKS.append({"name": f"{group}.{setup.__name__}", "group": group, "scale": scale,
+                           "repeat": repeat, "slow": slow, "setup": setup})
+        return setup
+    return register
+
+
+def _scenarios(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(0.5, 2.0, n) * P0, rng.uniform(0.002, 0.008, n), np.full(n, ALPHA)
+
+
+# === Integración global (los motores de kremer_sim.py) ===
+@benchmark("integration", "single")
+def euler():
+    from kremer.engine import simulate_batch
+    return lambda: simulate_batch(P0, G, ALPHA, YEARS_SIM)
+
+
+@benchmark("integration", "single")
+def analytic():
+    from kremer.engine import analytic_batch
+    return lambda: analytic_batch(P0, G, ALPHA, YEARS_SIM)
+
+
+@benchmark("integration", "single")
+def adaptive():
+    from kremer.adaptive import simulate_adaptive
+    return lambda: simulate_adaptive(P0, G, ALPHA, (YEARS_SIM[0], YEARS_SIM[-1]))(YEARS_SIM)
+
+
+@benchmark("integration", "single")
+def generalized():
+    from kremer.engine import simulate_generalized
+    return lambda: simulate_generalized(P0, G, ALPHA, YEARS_SIM)
+
+
+@benchmark("integration", "single")
+def lookup():
+    from kremer.lookup import load_lookup_table
+    table = load_lookup_table()
+    if table is None:
+        return None
+    return lambda: table.trajectory(P0, G, ALPHA, YEARS_SIM)
+
+
+@benchmark("integration", "long", repeat=3, slow=True)
+def euler_long_horizon():
+    from kremer.engine import simulate_batch
+    return lambda: simulate_batch(P0 / 40, G / 4, ALPHA, YEARS_LONG)
+
+
+@benchmark("integration", "long", repeat=3, slow=True)
+def adaptive_long_horizon():
+    from kremer.adaptive import simulate_adaptive
+    # Como la app: integrar y evaluar la salida densa en toda la grilla de años
+    return lambda: simulate_adaptive(P0 / 40, G / 4, ALPHA, (YEARS_LONG[0], YEARS_LONG[-1]))(YEARS_LONG)
+
+
+# === Regiones ===
+@benchmark("regions", "single")
+def simulate_population():
+    from kremer.engine import simulate_population
+    years = np.arange(-10000, 1500, 10)
+    return lambda: simulate_population(0.05, years, G, ALPHA)
+
+
+@benchmark("regions", "single")
+def isolated_pair():
+    from kremer.regions import simulate_regions
+    years = np.arange(-10000, 1500, 10)
+    return lambda: simulate_regions([0.05, 0.000004], G, ALPHA, years, cap=1000)
+
+
+@benchmark("regions", "1e3")
+def contact_1e3():
+    from kremer.regions import simulate_regions, uniform_contact
+    P0s, _, _ = _scenarios(1000)
+    contact = uniform_contact(1000, 1e-4)
+    years = np.arange(-10000, 2000, 10)
+    return lambda: simulate_regions(P0s / 1000, G, ALPHA, years, contact=contact)
+
+
+@benchmark("regions", "1e4", repeat=3, slow=True)
+def stochastic_pair_1e4():
+    from kremer.stochastic import simulate_stochastic
+    years = np.arange(-10000, 1500, 10)
+    return lambda: simulate_stochastic([0.05, 0.000004], G, ALPHA, years, replicas=10_000, record_every=5)
+
+
+# === Barridas de escenarios ===
+@benchmark("sweep", "1e3")
+def batch_1e3():
+    from kremer.engine import simulate_batch
+    P0s, gs, alphas = _scenarios(1000)
+    return lambda: simulate_batch(P0s, gs, alphas, YEARS_SIM)
+
+
+@benchmark("sweep", "1e5", repeat=3, slow=True)
+def ensemble_1e5():
+    from kremer.ensemble import run_ensemble
+    return lambda: run_ensemble(100_000, ("lognormal", G, 0.1), ("normal", ALPHA, 0.02),
+                                ("lognormal", P0, 0.1), YEARS_SIM)
+
+
+@benchmark("sweep", "1e5", repeat=3, slow=True)
+def calibration_losses_1e5():
+    from kremer.calibration import log_losses
+    from kremer.data import table_i
+    table = table_i()
+    P0s, gs, _ = _scenarios(100_000)
+    return lambda: log_losses(gs, P0s, ALPHA, table["Year"], table["Pop"], window=(-10000, 1950))
+
+
+@benchmark("sweep", "1e3")
+def forward_sensitivities_1e3():
+    from kremer.sensitivity import forward_sensitivities
+    P0s, gs, alphas = _scenarios(1000)
+    return lambda: forward_sensitivities(P0s, gs, alphas, YEARS_SIM)
+
+
+@benchmark("sweep", "1e5", repeat=3, slow=True)
+def sobol_indices_4096():
+    from kremer.sensitivity import sobol_indices
+    bounds = [(G * 0.9, G * 1.1), (ALPHA * 0.9, ALPHA * 1.1), (P0 * 0.9, P0 * 1.1)]
+    return lambda: sobol_indices(bounds, YEARS_SIM, n=4096, output_index=np.arange(0, YEARS_SIM.size, 10))
+
+
+# === Regresión del anexo 3 ===
+@benchmark("regression", "single")
+def growth_rates():
+    from kremer.data import derive_columns, table_i
+    table = table_i()
+    return lambda: derive_columns(table["Year"], table["Pop"])
+
+
+@benchmark("regression", "1e5")
+def growth_rates_1e5():
+    from kremer.data import derive_columns
+    rng = np.random.default_rng(0)
+    codes = np.repeat(np.arange(500), 200)
+    years = np.tile(np.arange(1800, 2000), 500)
+    pop = rng.uniform(1e-4, 1.0, codes.size)
+    return lambda: derive_columns(years, pop, codes)
+
+
+@benchmark("regression", "single")
+def ols_hac():
+    from kremer.regression import ols
+    x, y = _table_i_regression()
+    return lambda: ols(x, y, intercept=True)
+
+
+@benchmark("regression", "1e4")
+def bootstrap_1e4():
+    from kremer.regression import bootstrap_ols
+    x, y = _table_i_regression()
+    return lambda: bootstrap_ols(x, y, n_boot=10_000)
+
+
+@benchmark("regression", "2e3")
+def break_scan_dense():
+    from kremer.breaks import multiple_breaks, scan_break
+    rng = np.random.default_rng(0)
+    x = rng.uniform(0, 5, 2000)
+    y = np.where(np.arange(2000) < 1200, 1.0, 1.3) * x + rng.normal(0, 0.3, 2000)
+    return lambda: (scan_break(x, y, intercept=True), multiple_breaks(x, y, 2, intercept=True))
+
+
+def _table_i_regression():
+    from kremer.data import table_i
+    table = table_i()
+    x, y = table["Pop"][:-1], table["Growth_rate"][:-1]
+    valid = (x > 0) & np.isfinite(y)
+    return x[valid], y[valid]
+
+
+# === Figuras ===
+@benchmark("rendering", "single")
+def figure_construction():
+    from kremer.plots import figure_png, new_figure
+    from kremer.engine import simulate_batch
+    P, _ = simulate_batch(P0, G, ALPHA, YEARS_SIM)
+
+    def build_and_render():
+        fig = new_figure((8, 4))
+        ax = fig.add_subplot()
+        ax.plot(YEARS_SIM, P[0], '-', color="red", label="Simulación global")
+        ax.set_yscale("log")
+        ax.legend()
+        return figure_png(fig)
+    return build_and_render
+
+
+@benchmark("rendering", "single")
+def chart_template():
+    from kremer.plots import ChartTemplate
+    from kremer.engine import simulate_batch
+    P, _ = simulate_batch(P0, G, ALPHA, YEARS_SIM)
+    chart = ChartTemplate((8, 4), lambda ax: ax.set_yscale("log"))
+    chart.add_line("sim", '-', color="red", label="Simulación global")
+    return lambda: chart.render({"sim": (YEARS_SIM, P[0])})
+
+
+@benchmark("rendering", "single")
+def client_frames():
+    from kremer.frames import encode_frames, scenario_frames, slider_values
+    g_values, alpha_values = slider_values(0.001, 0.02, 0.001), slider_values(0.5, 0.9, 0.05)
+    return lambda: encode_frames(*scenario_frames(P0, g_values, alpha_values, YEARS_SIM, transition_start=1950))
+
+
+def _time(func, repeat):
+    func()  # calentamiento: importaciones perezosas, cachés de NumPy/matplotlib
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=Path(__file__).resolve().parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_benchmarks(keyword=None, quick=False, repeat=None, log=None):
+    """Corre los benchmarks seleccionados; devuelve el informe como dict."""
+    results = []
+    for bench in BENCHMARKS:
+        if (keyword and keyword not in bench["name"]) or (quick and bench["slow"]):
+            continue
+        func = bench["setup"]()
+        if func is None:
+            # Depende de algo que no está disponible (p. ej. la tabla precalculada)
+            continue
+        samples = _time(func, repeat or bench["repeat"])
+        entry = {
+            "name": bench["name"],
+            "group": bench["group"],
+            "scale": bench["scale"],
+            "repeat": len(samples),
+            "min_s": min(samples),
+            "median_s": float(np.median(samples)),
+            "mean_s": float(np.mean(samples)),
+        }
+        results.append(entry)
+        if log is not None:
+            log(f"{entry['name']:<40} {entry['scale']:>6} {entry['min_s'] * 1000:10.2f} ms")
+    return {"meta": _metadata(), "results": results}
+
+
+def compare(baseline, current, threshold=SLOWDOWN_THRESHOLD):
+    """Razón de tiempos mínimos (actual / base) por benchmark presente en ambos informes."""
+    base = {entry["name"]: entry for entry in baseline["results"]}
+    rows = []
+    for entry in current["results"]:
+        if entry["name"] in base:
+            ratio = entry["min_s"] / base[entry["name"]]["min_s"]
+            rows.append({"name": entry["name"], "ratio": ratio, "slower": ratio > threshold})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del modelo de Kremer (sin Streamlit).")
+    parser.add_argument("-o", "--output", default="bench.json", help="archivo JSON de resultados")
+    parser.add_argument("-k", "--keyword", help="corre solo los benchmarks cuyo nombre lo contiene")
+    parser.add_argument("--quick", action="store_true", help="omite 10^5 escenarios y horizontes largos")
+    parser.add_argument("--repeat", type=int, help="repeticiones por benchmark")
+    parser.add_argument("--compare", help="informe JSON base contra el que comparar")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.keyword, args.quick, args.repeat, log=print)
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"Resultados guardados en {args.output}")
+
+    if args.compare:
+        rows = compare(json.loads(Path(args.compare).read_text()), report)
+        for row in rows:
+            flag = "  <-- más lento" if row["slower"] else ""
+            print(f"{row['name']:<40} {row['ratio']:6.2f}x{flag}")
+        return 1 if any(row["slower"] for row in rows) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
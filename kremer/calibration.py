@@ -0,0 +1,105 @@
+"""Calibración automática de (g, P0) contra la Tabla I de Kremer.
+
+La dinámica dP/dt = g / (1 - alpha) P^2 depende de g y alpha solo a través de
+k = g / (1 - alpha), de modo que ambos no son identificables por separado: se
+fija alpha y se ajustan g y P0 minimizando el error cuadrático medio en
+logaritmos sobre una ventana de años.
+
+La búsqueda es una grilla gruesa vectorizada seguida de refinamientos locales
+(grillas cada vez más finas alrededor del mejor candidato). Las grillas
+grandes se reparten en bloques entre procesos.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from kremer.engine import simulate_batch
+
+DEFAULT_WINDOW = (-10000, 1950)
+DEFAULT_G_RANGE = (1e-4, 0.05)
+DEFAULT_P0_RANGE = (1e-4, 0.1)
+CHUNK_SIZE = 4096
+
+
+def _loss_chunk(args):
+    g, P0, alpha, years, idx, w, log_obs = args
+    P, stop = simulate_batch(P0, g, alpha, years)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_P = np.log(P)
+    log_fit = (1 - w) * log_P[:, idx] + w * log_P[:, idx + 1]
+    loss = np.mean((log_fit - log_obs) ** 2, axis=1)
+    return np.where((stop >= 0) | ~np.isfinite(loss), np.inf, loss)
+
+
+def log_losses(g, P0, alpha, years_obs, pop_obs, window=DEFAULT_WINDOW, dt=10, processes=None):
+    """Error cuadrático medio en logaritmos para cada candidato (g, P0).
+
+    La simulación arranca en ``window[0]`` con población ``P0``; los años
+    observados se comparan por interpolación lineal de log P.
+    """
+    g, P0 = np.broadcast_arrays(np.asarray(g, dtype=float).ravel(), np.asarray(P0, dtype=float).ravel())
+    years_obs = np.asarray(years_obs, dtype=float)
+    pop_obs = np.asarray(pop_obs, dtype=float)
+    in_window = (years_obs >= window[0]) & (years_obs <= window[1])
+    years_obs, log_obs = years_obs[in_window], np.log(pop_obs[in_window])
+
+    years = np.arange(window[0], window[1] + 2 * dt, dt, dtype=float)
+    idx = np.clip(np.searchsorted(years, years_obs, side="right") - 1, 0, years.size - 2)
+    w = (years_obs - years[idx]) / dt
+
+    chunks = [(g[s:s + CHUNK_SIZE], P0[s:s + CHUNK_SIZE], alpha, years, idx, w, log_obs)
+              for s in range(0, g.size, CHUNK_SIZE)]
+    if processes and processes > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            return np.concatenate(list(pool.map(_loss_chunk, chunks)))
+    return np.concatenate([_loss_chunk(c) for c in chunks])
+
+
+def calibrate(years_obs, pop_obs, alpha=0.7, window=DEFAULT_WINDOW, g_range=DEFAULT_G_RANGE,
+              P0_range=DEFAULT_P0_RANGE, n_grid=64, n_refine=4, processes=None):
+    """Ajusta g y P0 para un alpha dado.
+
+    Devuelve un diccionario con los parámetros ajustados, el error, los
+    residuos en logaritmos por año observado, el tiempo de ajuste y el número
+    de candidatos evaluados.
+    """
+    start = time.perf_counter()
+    log_g = np.linspace(*np.log(g_range), n_grid)
+    log_P0 = np.linspace(*np.log(P0_range), n_grid)
+    n_evaluated = 0
+
+    for _ in range(n_refine + 1):
+        G, Q = np.meshgrid(log_g, log_P0, indexing="ij")
+        losses = log_losses(np.exp(G), np.exp(Q), alpha, years_obs, pop_obs, window,
+                            processes=processes).reshape(G.shape)
+        n_evaluated += losses.size
+        best = np.unravel_index(np.argmin(losses), losses.shape)
+        best_g, best_P0 = G[best], Q[best]
+        # Nueva grilla de ±2 celdas alrededor del mejor candidato
+        half_g = 2 * (log_g[1] - log_g[0])
+        half_P0 = 2 * (log_P0[1] - log_P0[0])
+        log_g = np.linspace(best_g - half_g, best_g + half_g, n_grid)
+        log_P0 = np.linspace(best_P0 - half_P0, best_P0 + half_P0, n_grid)
+
+    g_fit, P0_fit = float(np.exp(best_g)), float(np.exp(best_P0))
+    loss = float(losses[best])
+
+    years_obs = np.asarray(years_obs, dtype=float)
+    in_window = (years_obs >= window[0]) & (years_obs <= window[1])
+    years_fit = np.arange(window[0], window[1] + 20, 10, dtype=float)
+    P_fit = simulate_batch(P0_fit, g_fit, alpha, years_fit)[0][0]
+    residuals = np.log(np.asarray(pop_obs, dtype=float)[in_window]) - np.interp(
+        years_obs[in_window], years_fit, np.log(P_fit))
+
+    return {
+        "g": g_fit,
+        "alpha": float(alpha),
+        "P0": P0_fit,
+        "k": g_fit / (1 - alpha),
+        "loss": loss,
+        "years": years_obs[in_window],
+        "residuals": residuals,
+        "elapsed": time.perf_counter() - start,
+        "n_evaluated": n_evaluated,
+    }
@@ -0,0 +1,183 @@
+"""Datos históricos: la Tabla I de Kremer (1993) y series externas en caché columnar.
+
+``table_i()`` construye las columnas una sola vez por proceso como arrays de
+NumPy de solo lectura, con las mismas claves que las columnas del
+``DataFrame`` que usaban las páginas. ``table_i_frame()`` arma el
+``DataFrame`` a partir de ellas e importa pandas recién en ese momento.
+
+Las series externas (p. ej. población por país o región, miles de filas) se
+leen una vez desde CSV o Parquet y se guardan como un ``.npy`` por columna,
+ordenadas por grupo y año, con el logaritmo y la tasa de crecimiento ya
+calculados. Las cargas siguientes abren esos archivos con
+``mmap_mode="r"``, sin pandas::
+
+    python -m kremer.data poblacion.csv --group Country --year Year --pop Population --scale 1e-9
+"""
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / "data" / "series_cache"
+SERIES_COLUMNS = ("Year", "Pop", "Log_pop", "Growth_rate")
+
+TABLE_I_YEARS = (
+    -1_000_000, -300_000, -25_000, -10_000, -5000, -4000, -3000, -2000, -1000,
+    -500, -200, 1, 200, 400, 600, 800, 1000, 1100, 1200, 1300, 1400, 1500,
+    1600, 1650, 1700, 1750, 1800, 1850, 1875, 1900, 1920, 1930, 1940, 1950,
+    1960, 1970, 1980, 1990,
+)
+TABLE_I_POP_MILLIONS = (
+    0.125, 1, 3.34, 4, 5, 7, 14, 27, 50, 100, 150, 170, 190, 190, 200,
+    220, 265, 320, 360, 360, 350, 425, 545, 545, 610, 720, 900,
+    1200, 1325, 1625, 1813, 1987, 2213, 2516, 3019, 3693, 4450, 5333,
+)
+
+
+def derive_columns(year, pop, codes=None):
+    """Ordena por (grupo, año) y agrega ``Log_pop`` y ``Growth_rate``.
+
+    ``Growth_rate`` es la tasa anual hacia la observación siguiente del mismo
+    grupo (NaN en la última de cada uno). Devuelve ``(columnas, orden)``.
+    """
+    year = np.asarray(year)
+    pop = np.asarray(pop, dtype=float)
+    if codes is None:
+        order = np.argsort(year, kind="stable")
+        same = np.ones(max(year.size - 1, 0), dtype=bool)
+    else:
+        order = np.lexsort((year, codes))
+        codes = np.asarray(codes)[order]
+        same = codes[1:] == codes[:-1]
+    year, pop = year[order], pop[order]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_pop = np.log(pop)
+        growth = np.full(pop.size, np.nan)
+        growth[:-1] = np.where(same, np.diff(log_pop) / np.diff(year.astype(float)), np.nan)
+    return {"Year": year, "Pop": pop, "Log_pop": log_pop, "Growth_rate": growth}, order
+
+
+@lru_cache(maxsize=None)
+def table_i():
+    """Columnas ``Year``, ``Pop_millions``, ``Pop`` (billones), ``Log_pop`` y ``Growth_rate``."""
+    pop_millions = np.array(TABLE_I_POP_MILLIONS, dtype=float)
+    derived, order = derive_columns(np.array(TABLE_I_YEARS, dtype=np.int64), pop_millions / 1000)
+    columns = {"Year": derived.pop("Year"), "Pop_millions": pop_millions[order], **derived}
+    for column in columns.values():
+        column.flags.writeable = False
+    return columns
+
+
+def table_i_frame():
+    """La Tabla I como ``DataFrame`` nuevo (se puede modificar sin afectar a otras páginas)."""
+    import pandas as pd
+
+    return pd.DataFrame({name: column.copy() for name, column in table_i().items()})
+
+
+class SeriesStore:
+    """Series por grupo en columnas contiguas, ordenadas por grupo y año.
+
+    Las filas del grupo ``names[i]`` son ``offsets[i]:offsets[i + 1]``, así
+    que ``group`` devuelve vistas (sin copiar) de las columnas mapeadas.
+    """
+
+    def __init__(self, columns, names, offsets):
+        self.columns = columns
+        self.names = names
+        self.offsets = offsets
+        self._index = {str(name): i for i, name in enumerate(names)}
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def group(self, name):
+        i = self._index[name]
+        rows = slice(int(self.offsets[i]), int(self.offsets[i + 1]))
+        return {column: values[rows] for column, values in self.columns.items()}
+
+
+def read_table(path, year="Year", pop="Pop", group=None):
+    """Lee solo las columnas necesarias de un CSV o Parquet; devuelve arrays.
+
+    Parquet requiere ``pyarrow`` (o ``fastparquet``), que pandas importa a demanda.
+    """
+    import pandas as pd
+
+    usecols = [year, pop] + ([group] if group is not None else [])
+    if Path(path).suffix.lower() in (".parquet", ".pq"):
+        frame = pd.read_parquet(path, columns=usecols)
+    else:
+        frame = pd.read_csv(path, usecols=usecols)
+    frame = frame.dropna(subset=[year, pop])
+    groups = None if group is None else frame[group].astype(str).to_numpy()
+    return frame[year].to_numpy(), frame[pop].to_numpy(dtype=float), groups
+
+
+def _cache_key(path, year, pop, group, scale):
+    stat = os.stat(path)
+    raw = f"{Path(path).resolve()}|{stat.st_mtime_ns}|{stat.st_size}|{year}|{pop}|{group}|{scale!r}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def build_series_cache(path, target, year="Year", pop="Pop", group=None, scale=1.0):
+    """Convierte la tabla en un directorio con un ``.npy`` por columna."""
+    years, pops, groups = read_table(path, year, pop, group)
+    if groups is None:
+        names, codes = np.array(["todos"]), np.zeros(years.size, dtype=np.int64)
+    else:
+        names, codes = np.unique(groups, return_inverse=True)
+    columns, order = derive_columns(years, pops * scale, codes)
+    offsets = np.searchsorted(codes[order], np.arange(names.size + 1))
+
+    # Se escribe en un directorio temporal y se renombra: otro proceso nunca ve una caché a medias
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(dir=target.parent, prefix=".tmp-"))
+    for name, values in columns.items():
+        np.save(staging / f"{name}.npy", values)
+    np.savez(staging / "meta.npz", names=names.astype(str), offsets=offsets, source=str(path))
+    try:
+        os.rename(staging, target)
+    except OSError:
+        # Otro proceso la construyó primero
+        shutil.rmtree(staging, ignore_errors=True)
+    return target
+
+
+def load_series(path, year="Year", pop="Pop", group=None, scale=1.0, cache_dir=DEFAULT_CACHE_DIR):
+    """Abre la caché columnar de ``path`` (construyéndola si falta o si la fuente cambió).
+
+    ``scale`` convierte las unidades de población (p. ej. ``1e-9`` para pasar
+    de personas a billones, como en el resto de la app).
+    """
+    target = Path(cache_dir) / f"{Path(path).stem}-{_cache_key(path, year, pop, group, scale)}"
+    if not (target / "meta.npz").exists():
+        build_series_cache(path, target, year, pop, group, scale)
+    with np.load(target / "meta.npz") as meta:
+        names, offsets = meta["names"], meta["offsets"]
+    columns = {name: np.load(target / f"{name}.npy", mmap_mode="r") for name in SERIES_COLUMNS}
+    return SeriesStore(columns, names, offsets)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Construye la caché columnar de una serie de población.")
+    parser.add_argument("path")
+    parser.add_argument("--year", default="Year")
+    parser.add_argument("--pop", default="Pop")
+    parser.add_argument("--group", default=None)
+    parser.add_argument("--scale", type=float, default=1.0)
+    args = parser.parse_args(sys.argv[1:])
+    store = load_series(args.path, args.year, args.pop, args.group, args.scale)
+    print(f"{len(store):,} filas en {len(store.names):,} grupos")
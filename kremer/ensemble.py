@@ -0,0 +1,143 @@
+"""Ensambles Monte Carlo del modelo de Kremer con bandas de percentiles.
+
+Los parámetros se sortean de distribuciones dadas como ``(tipo, a, b)``:
+
+- ``("fixed", valor, _)``
+- ``("uniform", mínimo, máximo)``
+- ``("normal", media, desvío)``
+- ``("lognormal", mediana, sigma)``
+
+Las trayectorias se integran por bloques con ``simulate_batch``; cada bloque
+acumula un histograma de log P por año, de modo que 10^5 trayectorias no
+necesitan estar completas en memoria. Las trayectorias que ya explotaron (o
+que superan el rango del histograma) se cuentan aparte, como valores
+infinitos: un percentil que cae entre ellas vale ``inf`` en lugar de quedar
+pegado al techo del rango. Cada bloque recibe su propia semilla derivada de
+``seed``: el resultado es el mismo con o sin procesos, y ``executor`` permite
+reutilizar un pool ya creado.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from kremer.engine import apply_demographic_transition, simulate_batch
+
+DEFAULT_PERCENTILES = (5, 50, 95)
+CHUNK_SIZE = 5000
+LOG_P_RANGE = (np.log(1e-8), np.log(1e6))
+N_BINS = 1024
+
+
+def sample_distribution(dist, n, rng):
+    """Sortea ``n`` valores de una distribución ``(tipo, a, b)``."""
+    kind, a, b = dist
+    if kind == "fixed":
+        return np.full(n, float(a))
+    if kind == "uniform":
+        return rng.uniform(a, b, n)
+    if kind == "normal":
+        return rng.normal(a, b, n)
+    if kind == "lognormal":
+        return a * np.exp(rng.normal(0.0, b, n))
+    raise ValueError(f"Distribución desconocida: {kind!r}")
+
+
+def sample_parameters(n, g_dist, alpha_dist, P0_dist, rng):
+    """Sortea (g, alpha, P0) dentro de sus dominios válidos."""
+    g = np.maximum(sample_distribution(g_dist, n, rng), 1e-9)
+    alpha = np.clip(sample_distribution(alpha_dist, n, rng), 0.01, 0.99)
+    P0 = np.maximum(sample_distribution(P0_dist, n, rng), 1e-9)
+    return g, alpha, P0
+
+
+def chunk_seeds(n, chunk_size=CHUNK_SIZE, seed=0):
+    """Tamaño y semilla de cada bloque: definen las mismas trayectorias con o sin procesos."""
+    sizes = [min(chunk_size, n - s) for s in range(0, n, chunk_size)]
+    return list(zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))))
+
+
+def simulate_chunk(n, seed, g_dist, alpha_dist, P0_dist, years, transition_start=None):
+    """Sortea e integra un bloque; devuelve ``(g, alpha, P0, P, stop)``."""
+    rng = np.random.default_rng(seed)
+    g, alpha, P0 = sample_parameters(n, g_dist, alpha_dist, P0_dist, rng)
+    P, stop = simulate_batch(P0, g, alpha, years)
+    if transition_start is not None:
+        ok = stop < 0
+        P[ok] = apply_demographic_transition(P[ok], years, start=transition_start)
+    return g, alpha, P0, P, stop
+
+
+def _chunk_histogram(args):
+    n, seed, g_dist, alpha_dist, P0_dist, years, transition_start = args
+    _, _, _, P, stop = simulate_chunk(n, seed, g_dist, alpha_dist, P0_dist, years, transition_start)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_P = np.log(P, out=P)
+    # Explotadas (desde su paso de explosión) o sobre el rango: fuera del histograma
+    steps = np.arange(years.size)
+    over = (stop[:, None] >= 0) & (steps >= stop[:, None])
+    over |= ~(log_P <= LOG_P_RANGE[1])
+    np.nan_to_num(log_P, copy=False, nan=LOG_P_RANGE[1], posinf=LOG_P_RANGE[1], neginf=LOG_P_RANGE[0])
+    width = (LOG_P_RANGE[1] - LOG_P_RANGE[0]) / N_BINS
+    log_P -= LOG_P_RANGE[0]
+    log_P /= width
+    np.clip(log_P, 0, N_BINS - 1, out=log_P)
+    bins = log_P.astype(np.intp)
+    bins += steps * N_BINS
+    counts = np.bincount(bins[~over], minlength=years.size * N_BINS).reshape(years.size, N_BINS)
+    return counts, over.sum(axis=0), int((stop >= 0).sum())
+
+
+def histogram_percentiles(counts, percentiles=DEFAULT_PERCENTILES, over=None):
+    """Percentiles por año a partir de un histograma (año × bin) de log P.
+
+    ``over`` cuenta, por año, las trayectorias por encima del rango (las que
+    explotaron); los percentiles que caen entre ellas son ``inf``.
+    """
+    width = (LOG_P_RANGE[1] - LOG_P_RANGE[0]) / N_BINS
+    cum = np.cumsum(counts, axis=1)
+    inside = cum[:, -1:]
+    total = inside if over is None else inside + np.asarray(over)[:, None]
+    bands = []
+    for q in percentiles:
+        target = q / 100 * total
+        idx = np.minimum((cum < target).sum(axis=1), N_BINS - 1)
+        below = np.take_along_axis(cum, np.maximum(idx - 1, 0)[:, None], axis=1)[:, 0]
+        below = np.where(idx > 0, below, 0)
+        in_bin = counts[np.arange(counts.shape[0]), idx]
+        frac = np.divide(target[:, 0] - below, in_bin, out=np.full(idx.shape, 0.5), where=in_bin > 0)
+        band = np.exp(LOG_P_RANGE[0] + (idx + np.clip(frac, 0, 1)) * width)
+        bands.append(np.where(target[:, 0] > inside[:, 0], np.inf, band))
+    return np.array(bands)
+
+
+def run_ensemble(n, g_dist, alpha_dist, P0_dist, years, seed=0, transition_start=None,
+                 percentiles=DEFAULT_PERCENTILES, chunk_size=CHUNK_SIZE, processes=None, executor=None):
+    """Integra ``n`` trayectorias sorteadas y devuelve bandas de percentiles.
+
+    Devuelve un diccionario con ``bands`` (percentil × año; ``inf`` donde el
+    percentil cae entre trayectorias explotadas), los ``percentiles``
+    pedidos, la fracción de trayectorias que explotaron y ``over_fraction``,
+    la fracción por año que ya explotó o superó el rango.
+    """
+    years = np.asarray(years, dtype=float)
+    tasks = [(size, s, g_dist, alpha_dist, P0_dist, years, transition_start)
+             for size, s in chunk_seeds(n, chunk_size, seed)]
+
+    if executor is not None and len(tasks) > 1:
+        results = list(executor.map(_chunk_histogram, tasks))
+    elif processes and processes > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(_chunk_histogram, tasks))
+    else:
+        results = [_chunk_histogram(t) for t in tasks]
+
+    counts = sum(r[0] for r in results)
+    over = sum(r[1] for r in results)
+    exploded = sum(r[2] for r in results)
+    return {
+        "bands": histogram_percentiles(counts, percentiles, over),
+        "percentiles": tuple(percentiles),
+        "exploded_fraction": exploded / n,
+        "over_fraction": over / n,
+    }
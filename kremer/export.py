@@ -0,0 +1,202 @@
+"""Exportación de escenarios y ensambles a Parquet, NPZ o CSV.
+
+Un escenario es un dict ``nombre → (años, valores)`` (p. ej. ``P_global``,
+``P_with_trans``, ``P_old`` o ``ratio``); se exporta en formato largo, una
+fila por serie y año. En Parquet y NPZ los valores se guardan por defecto
+como logaritmo natural en float32: el error relativo en la población es del
+orden de 1e-7 y los archivos binarios ocupan la mitad que en float64 (más aún
+tras comprimir). En CSV, en cambio, el tamaño lo fija el texto de cada número
+y el logaritmo no ahorra nada (según las series ocupa un poco más o un poco
+menos), así que por defecto se escriben los valores tal cual, legibles.
+
+Los ensambles se integran y escriben bloque a bloque (las mismas
+trayectorias que ``run_ensemble`` con la misma semilla), así que nunca
+están completos en memoria: en Parquet cada bloque es un grupo de filas, en
+CSV un tramo de líneas y en NPZ un tramo del arreglo ``log_P`` (o ``P``),
+cuyo tamaño total se conoce de antemano. Como en los escenarios, las
+trayectorias van como log en float32 salvo en CSV, donde van los valores::
+
+    from kremer.export import write_ensemble
+    write_ensemble("ensamble.parquet", 1_000_000, ("lognormal", 0.005, 0.1),
+                   ("normal", 0.7, 0.02), ("lognormal", 0.004, 0.1), years)
+"""
+import importlib.util
+import io
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+from kremer.ensemble import CHUNK_SIZE, chunk_seeds, simulate_chunk
+
+FORMATS = ("parquet", "npz", "csv")
+MIME_TYPES = {"parquet": "application/vnd.apache.parquet", "npz": "application/octet-stream", "csv": "text/csv"}
+
+
+def available_formats():
+    """Formatos que se pueden escribir aquí (Parquet solo con pyarrow instalado)."""
+    return FORMATS if importlib.util.find_spec("pyarrow") is not None else FORMATS[1:]
+
+
+def _values(values, log_values):
+    if not log_values:
+        return np.asarray(values, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.log(np.asarray(values, dtype=float)).astype(np.float32)
+
+
+def scenario_columns(series, log_values=True):
+    """Columnas en formato largo: ``serie``, ``year`` y ``log_value`` (o ``value``)."""
+    names, years, values = [], [], []
+    for name, (x, y) in series.items():
+        names.append(np.full(len(x), name))
+        years.append(np.asarray(x, dtype=float))
+        values.append(_values(y, log_values))
+    return {
+        "serie": np.concatenate(names),
+        "year": np.concatenate(years),
+        "log_value" if log_values else "value": np.concatenate(values),
+    }
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise RuntimeError("La exportación a Parquet requiere pyarrow; use NPZ o CSV.") from None
+
+
+def export_scenario(series, fmt="parquet", log_values=None):
+    """Bytes del archivo ``fmt`` con las series del escenario.
+
+    ``log_values`` (por defecto, sí en Parquet y NPZ y no en CSV) guarda
+    log(valor) en float32 en lugar del valor en float64.
+    """
+    if log_values is None:
+        log_values = fmt != "csv"
+    columns = scenario_columns(series, log_values)
+    buffer = io.BytesIO()
+    if fmt == "parquet":
+        _require_pyarrow()
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.table({name: pa.array(values) for name, values in columns.items()})
+        table = table.set_column(0, "serie", table.column("serie").dictionary_encode())
+        pq.write_table(table, buffer, compression="zstd")
+    elif fmt == "npz":
+        np.savez_compressed(buffer, **columns)
+    elif fmt == "csv":
+        value_name = list(columns)[2]
+        text = io.StringIO()
+        text.write(f"serie,year,{value_name}\n")
+        for name, year, value in zip(*columns.values()):
+            text.write(f"{name},{year:.0f},{value:.9g}\n")
+        buffer.write(text.getvalue().encode())
+    else:
+        raise ValueError(f"Formato desconocido: {fmt!r} (use {', '.join(FORMATS)}).")
+    return buffer.getvalue()
+
+
+def ensemble_chunks(n, g_dist, alpha_dist, P0_dist, years, seed=0, transition_start=None,
+                    chunk_size=CHUNK_SIZE, log_values=True):
+    """Genera bloques con ``draw``, ``g``, ``alpha``, ``P0``, ``exploded`` y ``log_P`` (float32).
+
+    Con ``log_values=False`` la última columna es ``P``, en float64.
+    """
+    years = np.asarray(years, dtype=float)
+    value_name = "log_P" if log_values else "P"
+    start = 0
+    for size, chunk_seed in chunk_seeds(n, chunk_size, seed):
+        g, alpha, P0, P, stop = simulate_chunk(size, chunk_seed, g_dist, alpha_dist, P0_dist, years,
+                                               transition_start)
+        yield {"draw": np.arange(start, start + size), "g": g, "alpha": alpha, "P0": P0,
+               "exploded": stop >= 0, value_name: _values(P, log_values)}
+        start += size
+
+
+def _write_parquet_stream(target, chunks, years, value_name):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for chunk in chunks:
+            P = chunk.pop(value_name)
+            arrays = {name: pa.array(values) for name, values in chunk.items()}
+            arrays[value_name] = pa.FixedSizeListArray.from_arrays(pa.array(P.ravel()), P.shape[1])
+            table = pa.table(arrays)
+            if writer is None:
+                schema = table.schema.with_metadata({"years": ",".join(f"{y:g}" for y in years)})
+                writer = pq.ParquetWriter(target, schema, compression="zstd")
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _write_npz_stream(target, chunks, years, n, value_name):
+    # Las trayectorias se escriben por tramos dentro de su miembro del zip; los
+    # parámetros (n valores cada uno) se guardan al final
+    params = {}
+    dtype = np.dtype(np.float32 if value_name == "log_P" else float)
+    # Sin comprimir, como np.savez: log P en float32 apenas se comprime y deflate es lento
+    with zipfile.ZipFile(target, "w") as archive:
+        with archive.open(f"{value_name}.npy", "w", force_zip64=True) as member:
+            header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False,
+                      "shape": (n, len(years))}
+            np.lib.format.write_array_header_1_0(member, header)
+            for chunk in chunks:
+                member.write(np.ascontiguousarray(chunk.pop(value_name), dtype=dtype).tobytes())
+                for name, values in chunk.items():
+                    params.setdefault(name, []).append(values)
+        for name, values in [("years", [years]), *params.items()]:
+            with archive.open(f"{name}.npy", "w") as member:
+                np.lib.format.write_array(member, np.concatenate(values))
+
+
+def _write_csv_stream(target, chunks, years, value_name):
+    columns = ["draw", "g", "alpha", "P0", "exploded"] + [f"{y:g}" for y in years]
+    meaning = ("logaritmo natural de la población" if value_name == "log_P" else "población") + ", billones"
+    target.write((f"# {value_name} por año ({meaning})\n" + ",".join(columns) + "\n").encode())
+    # float32 solo tiene 7 cifras significativas; los valores en float64, 9
+    digits = "%.7g" if value_name == "log_P" else "%.9g"
+    for chunk in chunks:
+        params = np.column_stack([chunk["draw"], chunk["g"], chunk["alpha"], chunk["P0"], chunk["exploded"]])
+        text = io.StringIO()
+        np.savetxt(text, np.column_stack([params, chunk[value_name]]), delimiter=",",
+                   fmt=["%d", "%.9g", "%.9g", "%.9g", "%d"] + [digits] * len(years))
+        target.write(text.getvalue().encode())
+
+
+def write_ensemble(target, n, g_dist, alpha_dist, P0_dist, years, fmt=None, seed=0, transition_start=None,
+                   chunk_size=CHUNK_SIZE, log_values=None):
+    """Integra ``n`` trayectorias por bloques y las escribe en ``target`` (ruta o archivo binario).
+
+    ``fmt`` se deduce de la extensión si ``target`` es una ruta. ``log_values``
+    funciona como en ``export_scenario`` (por defecto, sí salvo en CSV): las
+    trayectorias van como ``log_P`` en float32 o como ``P``. Devuelve ``target``.
+    """
+    if fmt is None:
+        fmt = Path(target).suffix.lstrip(".").lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato desconocido: {fmt!r} (use {', '.join(FORMATS)}).")
+    if fmt == "parquet":
+        _require_pyarrow()
+    if log_values is None:
+        log_values = fmt != "csv"
+    value_name = "log_P" if log_values else "P"
+    years = np.asarray(years, dtype=float)
+    chunks = ensemble_chunks(n, g_dist, alpha_dist, P0_dist, years, seed, transition_start, chunk_size,
+                             log_values)
+
+    if fmt == "parquet":
+        _write_parquet_stream(target, chunks, years, value_name)
+    elif fmt == "npz":
+        _write_npz_stream(target, chunks, years, n, value_name)
+    elif isinstance(target, (str, Path)):
+        with open(target, "wb") as f:
+            _write_csv_stream(f, chunks, years, value_name)
+    else:
+        _write_csv_stream(target, chunks, years, value_name)
+    return target
@@ -0,0 +1,210 @@
+"""Cuadros precalculados para recorrer g y alpha en el navegador, sin volver al servidor.
+
+Los sliders de g y alpha tienen pocas posiciones (20 × 9), así que todas las
+trayectorias caben en un solo envío: se integran de una vez con
+``simulate_batch``, se guardan como log10 P cuantizado a 16 bits (error
+relativo del orden de 1e-4 en P), se codifican como diferencias entre años
+consecutivos (casi siempre pequeñas) y se comprimen con gzip. Para la grilla
+de la app son unos 30 kB, frente a 1.7 MB en float64; el navegador los
+descomprime con ``DecompressionStream`` y pasa de un cuadro a otro sin
+consultar al servidor::
+
+    log_P, stop = scenario_frames(0.004, slider_values(0.001, 0.02, 0.001),
+                                  slider_values(0.5, 0.9, 0.05), years, transition_start=1950)
+    html = frames_html(encode_frames(log_P, stop), g_values, alpha_values, years)
+"""
+import base64
+import gzip
+import json
+
+import numpy as np
+
+from kremer.engine import P_CAP, apply_demographic_transition, simulate_batch
+
+LEVELS = 65535
+HEIGHT = 470  # alto del iframe: gráfico, dos sliders y el pie
+
+
+def slider_values(lo, hi, step):
+    """Las posiciones de un ``st.slider`` con esos límites y paso."""
+    n = int(round((hi - lo) / step)) + 1
+    return np.round(lo + step * np.arange(n), 10)
+
+
+def scenario_frames(P0, g_values, alpha_values, years, transition_start=None, cap=P_CAP):
+    """log10 P para cada par de la grilla, de forma (g × alpha × año), y el paso de explosión.
+
+    Como en la app, la transición demográfica solo se aplica a las
+    trayectorias que no explotan; las que explotan quedan fijas en ``cap``.
+    """
+    G, A = np.meshgrid(g_values, alpha_values, indexing="ij")
+    years = np.asarray(years, dtype=float)
+    P, stop = simulate_batch(P0, G.ravel(), A.ravel(), years, cap=cap)
+    if transition_start is not None:
+        ok = stop < 0
+        P[ok] = apply_demographic_transition(P[ok], years, start=transition_start)
+    return np.log10(P).reshape(G.shape + (years.size,)), stop.reshape(G.shape)
+
+
+def encode_frames(log_P, stop):
+    """Carga compacta para el navegador: uint16, diferencias por fila, gzip y base64."""
+    log_P = np.asarray(log_P, dtype=float)
+    lo, hi = float(log_P.min()), float(log_P.max())
+    q = np.round((log_P - lo) / max(hi - lo, 1e-12) * LEVELS).astype(np.int64)
+    rows = q.reshape(-1, q.shape[-1])
+    # Diferencias módulo 2^16: el navegador las acumula con el mismo desborde
+    deltas = (np.diff(rows, axis=1, prepend=0) % 65536).astype("<u2")
+    # mtime fijo: la misma grilla produce los mismos bytes y el iframe no se recarga
+    data = gzip.compress(deltas.tobytes(), compresslevel=9, mtime=0)
+    return {"lo": lo, "hi": hi, "levels": LEVELS, "shape": list(log_P.shape),
+            "stop": np.asarray(stop).ravel().tolist(), "data": base64.b64encode(data).decode("ascii")}
+
+
+def decode_frames(payload):
+    """Inversa de ``encode_frames`` (la misma cuenta que hace el navegador)."""
+    deltas = np.frombuffer(gzip.decompress(base64.b64decode(payload["data"])), dtype="<u2")
+    rows = np.cumsum(deltas.reshape(-1, payload["shape"][-1]), axis=1) % 65536
+    log_P = payload["lo"] + rows * (payload["hi"] - payload["lo"]) / payload["levels"]
+    return log_P.reshape(payload["shape"]), np.reshape(payload["stop"], payload["shape"][:-1])
+
+
+def frames_html(payload, g_values, alpha_values, years, g=None, alpha=None, observed=None, xticks=()):
+    """Página autocontenida (para ``st.iframe``) con el gráfico y sus dos sliders.
+
+    ``observed`` son pares (año, población) que se dibujan como puntos;
+    ``xticks``, pares (año, etiqueta). ``g`` y ``alpha`` eligen el cuadro inicial.
+    """
+    years = np.asarray(years, dtype=float)
+    step = np.diff(years)
+    if not np.allclose(step, step[0]):
+        raise ValueError("Los cuadros requieren años equiespaciados.")
+    g_values, alpha_values = np.asarray(g_values), np.asarray(alpha_values)
+    observed = [] if observed is None else [[float(x), float(p)] for x, p in observed]
+    log_observed = [np.log10(p) for _, p in observed]
+    data = dict(payload,
+                g=g_values.tolist(), alpha=alpha_values.tolist(),
+                start=float(years[0]), step=float(step[0]), count=int(years.size),
+                g0=int(np.abs(g_values - (g_values[0] if g is None else g)).argmin()),
+                alpha0=int(np.abs(alpha_values - (alpha_values[0] if alpha is None else alpha)).argmin()),
+                observed=observed, xticks=[[float(x), str(label)] for x, label in xticks],
+                yrange=[np.floor(min([payload["lo"]] + log_observed)), np.ceil(payload["hi"])],
+                linear_max=1.5 * max([p for _, p in observed] or [1.0]))
+    return _TEMPLATE.replace("/*DATA*/", json.dumps(data, separators=(",", ":")))
+
+
+_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><style>
+  body { margin: 0; font-family: "Source Sans Pro", sans-serif; color: #31333f; }
+  canvas { width: 100%; height: 340px; display: block; }
+  .controls { display: grid; grid-template-columns: 7em 1fr; gap: 4px 12px; align-items: center; margin-top: 6px; }
+  input[type=range] { width: 100%; accent-color: #ff4b4b; }
+  #info { font-size: 0.9em; margin-top: 4px; }
+</style></head><body>
+<canvas id="chart"></canvas>
+<div class="controls">
+  <span>g = <b id="g-value"></b></span><input type="range" id="g" min="0" step="1">
+  <span>α = <b id="alpha-value"></b></span><input type="range" id="alpha" min="0" step="1">
+  <span></span><label><input type="checkbox" id="log" checked> Escala logarítmica</label>
+</div>
+<div id="info"></div>
+<script>
+const D = /*DATA*/;
+const nG = D.g.length, nA = D.alpha.length, T = D.count;
+const canvas = document.getElementById("chart"), ctx = canvas.getContext("2d");
+const gInput = document.getElementById("g"), aInput = document.getElementById("alpha");
+const logInput = document.getElementById("log"), info = document.getElementById("info");
+let frames = null;
+
+async function decode() {
+  const bin = atob(D.data), bytes = new Uint8Array(bin.length);
+  for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+  const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("gzip"));
+  const view = new DataView(await new Response(stream).arrayBuffer());
+  const out = new Float32Array(nG * nA * T), scale = (D.hi - D.lo) / D.levels;
+  for (let r = 0; r < nG * nA; r++) {
+    let q = 0;
+    for (let t = 0; t < T; t++) {
+      q = (q + view.getUint16(2 * (r * T + t), true)) & 0xffff;
+      out[r * T + t] = D.lo + q * scale;
+    }
+  }
+  return out;
+}
+
+function formatPop(p) {
+  return p >= 1 ? p.toLocaleString("es", {maximumFractionDigits: 2}) : p.toPrecision(2);
+}
+
+function draw() {
+  const ig = +gInput.value, ia = +aInput.value, row = ig * nA + ia, log = logInput.checked;
+  document.getElementById("g-value").textContent = D.g[ig].toFixed(3);
+  document.getElementById("alpha-value").textContent = D.alpha[ia].toFixed(2);
+  const dpr = window.devicePixelRatio || 1, w = canvas.clientWidth, h = canvas.clientHeight;
+  canvas.width = w * dpr; canvas.height = h * dpr;
+  ctx.setTransform(dpr, 0, 0, dpr, 0, 0);
+  ctx.clearRect(0, 0, w, h);
+
+  const left = 64, right = 12, top = 12, bottom = 36, end = D.start + D.step * (T - 1);
+  const yLo = log ? D.yrange[0] : 0, yHi = log ? D.yrange[1] : D.linear_max;
+  const x = year => left + (year - D.start) / (end - D.start) * (w - left - right);
+  const y = v => top + (1 - (v - yLo) / (yHi - yLo)) * (h - top - bottom);
+  const value = v => log ? v : Math.pow(10, v);
+
+  ctx.font = "11px sans-serif"; ctx.lineWidth = 0.5; ctx.strokeStyle = "#ccc"; ctx.fillStyle = "#555";
+  ctx.setLineDash([4, 3]);
+  ctx.textAlign = "center";
+  for (const [year, label] of D.xticks) {
+    ctx.beginPath(); ctx.moveTo(x(year), top); ctx.lineTo(x(year), h - bottom); ctx.stroke();
+    ctx.fillText(label, x(year), h - bottom + 14);
+  }
+  ctx.textAlign = "right";
+  const yStep = log ? 1 : Math.max(1, Math.round(yHi / 5));
+  for (let v = Math.ceil(yLo); v <= yHi; v += yStep) {
+    ctx.beginPath(); ctx.moveTo(left, y(v)); ctx.lineTo(w - right, y(v)); ctx.stroke();
+    ctx.fillText(log ? formatPop(Math.pow(10, v)) : String(v), left - 6, y(v) + 4);
+  }
+  ctx.setLineDash([]);
+  ctx.textAlign = "center";
+  ctx.fillText("Año (negativo = A.C., positivo = D.C.)", left + (w - left - right) / 2, h - 4);
+  ctx.save(); ctx.translate(12, top + (h - top - bottom) / 2); ctx.rotate(-Math.PI / 2);
+  ctx.fillText("Población (billones)", 0, 0); ctx.restore();
+
+  ctx.save();
+  ctx.beginPath(); ctx.rect(left, top, w - left - right, h - top - bottom); ctx.clip();
+  ctx.fillStyle = "black";
+  for (const [year, p] of D.observed) {
+    ctx.beginPath(); ctx.arc(x(year), y(log ? Math.log10(p) : p), 2.5, 0, 2 * Math.PI); ctx.fill();
+  }
+  const stop = D.stop[row], last = stop < 0 ? T : stop;
+  if (frames) {
+    ctx.strokeStyle = "red"; ctx.lineWidth = 1.5; ctx.beginPath();
+    for (let t = 0; t < last; t++) {
+      const px = x(D.start + D.step * t), py = y(value(frames[row * T + t]));
+      if (t === 0) ctx.moveTo(px, py); else ctx.lineTo(px, py);
+    }
+    ctx.stroke();
+  }
+  ctx.restore();
+  ctx.strokeStyle = "#888"; ctx.lineWidth = 1;
+  ctx.strokeRect(left, top, w - left - right, h - top - bottom);
+
+  if (!frames) return;
+  const k = D.g[ig] / (1 - D.alpha[ia]);
+  info.textContent = stop >= 0
+    ? "⚠️ Explosión en el año " + (D.start + D.step * stop).toLocaleString("es") + " (k = " + k.toFixed(5) + ")."
+    : "Población en " + end + ": " + formatPop(Math.pow(10, frames[row * T + T - 1])) + " billones (k = " + k.toFixed(5) + ").";
+}
+
+gInput.max = nG - 1; gInput.value = D.g0;
+aInput.max = nA - 1; aInput.value = D.alpha0;
+for (const input of [gInput, aInput, logInput]) input.addEventListener("input", draw);
+window.addEventListener("resize", draw);
+draw();
+if (typeof DecompressionStream === "undefined") {
+  info.textContent = "Este navegador no puede descomprimir los cuadros (DecompressionStream).";
+} else {
+  decode().then(out => { frames = out; draw(); });
+}
+</script>
+</body></html>
+"""
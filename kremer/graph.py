@@ -0,0 +1,96 @@
+"""Grafo incremental de series derivadas.
+
+Cada nodo declara sus entradas y una función pura que lo calcula a partir de
+ellas. Los valores se calculan a demanda (``graph["nombre"]``), se guardan y
+solo se recalculan cuando cambió alguna entrada aguas arriba. Si un nodo
+recalculado produce el mismo valor que antes, los nodos que dependen de él no
+se recalculan (corte temprano): por ejemplo, mover un parámetro que no altera
+la trayectoria base no vuelve a derivar tasas de crecimiento ni recortes.
+"""
+import numpy as np
+
+
+def _same(a, b):
+    """Igualdad de valores, tolerante a arrays y tuplas de arrays."""
+    if a is b:
+        return True
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return (isinstance(a, np.ndarray) and isinstance(b, np.ndarray)
+                and a.shape == b.shape and np.array_equal(a, b, equal_nan=a.dtype.kind == "f"))
+    if isinstance(a, (tuple, list)) and isinstance(b, (tuple, list)):
+        return type(a) is type(b) and len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_same(a[key], b[key]) for key in a)
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        return False
+
+
+class _Node:
+    __slots__ = ("func", "inputs", "value", "changed_at", "verified_at")
+
+    def __init__(self, func, inputs):
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.value = None
+        self.changed_at = 0     # revisión en la que el valor cambió por última vez
+        self.verified_at = -1   # revisión en la que se comprobó que estaba al día
+
+
+class SeriesGraph:
+    """Grafo de dependencias con evaluación perezosa y memoización por revisión.
+
+    Las fuentes se fijan con ``set``; cada cambio efectivo avanza la revisión.
+    Al pedir un nodo, se verifican sus entradas y solo se vuelve a llamar a su
+    función si alguna cambió después de la última vez que se calculó.
+    ``computations`` cuenta cuántas veces se evaluó cada nodo.
+    """
+
+    def __init__(self):
+        self._nodes = {}
+        self._revision = 0
+        self.computations = {}
+
+    def source(self, name, value=None):
+        """Declara una entrada externa (parámetro de la interfaz)."""
+        node = self._nodes[name] = _Node(None, ())
+        node.value = value
+        return self
+
+    def node(self, name, inputs, func):
+        """Declara ``name = func(*[valor de cada entrada])``."""
+        missing = [dep for dep in inputs if dep not in self._nodes]
+        if missing:
+            raise KeyError(f"Entradas no declaradas para {name!r}: {missing}")
+        self._nodes[name] = _Node(func, inputs)
+        self.computations[name] = 0
+        return self
+
+    def set(self, **values):
+        """Actualiza fuentes; solo las que cambian invalidan a sus dependientes."""
+        changed = [name for name, value in values.items() if not _same(self._nodes[name].value, value)]
+        if changed:
+            self._revision += 1
+            for name in changed:
+                node = self._nodes[name]
+                node.value = values[name]
+                node.changed_at = self._revision
+        return self
+
+    def _refresh(self, name):
+        node = self._nodes[name]
+        if node.func is None or node.verified_at == self._revision:
+            return node
+        inputs = [self._refresh(dep) for dep in node.inputs]
+        if node.verified_at < 0 or any(dep.changed_at > node.verified_at for dep in inputs):
+            value = node.func(*(dep.value for dep in inputs))
+            self.computations[name] += 1
+            if node.verified_at < 0 or not _same(node.value, value):
+                node.value = value
+                node.changed_at = self._revision
+        node.verified_at = self._revision
+        return node
+
+    def __getitem__(self, name):
+        return self._refresh(name).value
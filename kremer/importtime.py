@@ -0,0 +1,74 @@
+"""Informe de tiempos de importación en frío.
+
+Cada módulo se importa en un intérprete nuevo con ``python -X importtime``,
+así que los tiempos corresponden a un arranque en frío (sin nada en
+``sys.modules``)::
+
+    python -m kremer.importtime                        # módulos por defecto
+    python -m kremer.importtime pandas kremer.plots    # módulos a elección
+
+Para cada módulo se informa el tiempo total y las dependencias que más pesan.
+"""
+import subprocess
+import sys
+
+# Lo que cargan las páginas antes de su primer gráfico, más las dependencias pesadas
+DEFAULT_MODULES = (
+    "streamlit",
+    "kremer",
+    "kremer.data",
+    "kremer.engine",
+    "kremer.plots",
+    "pandas",
+    "matplotlib.figure",
+)
+
+
+def import_times(module):
+    """Importa ``module`` en un proceso nuevo.
+
+    Devuelve ``(total_s, dependencias)``, donde ``dependencias`` mapea cada
+    importación directa de ``module`` a su tiempo acumulado en segundos.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True
+    )
+    # -X importtime lista los hijos antes que el padre, con dos espacios de sangría por nivel
+    children = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        if depth == 0:
+            if name == module:
+                return int(cumulative_us) / 1e6, children
+            children = {}
+        elif depth == 1:
+            children[name] = int(cumulative_us) / 1e6
+    # Ya estaba importado durante el arranque del intérprete
+    return 0.0, {}
+
+
+def import_report(modules=DEFAULT_MODULES, top=5):
+    """Tiempo total de cada módulo y sus ``top`` importaciones directas más costosas."""
+    report = []
+    for module in modules:
+        total, children = import_times(module)
+        heaviest = sorted(children.items(), key=lambda item: item[1], reverse=True)[:top]
+        report.append({"module": module, "total": total, "heaviest": heaviest})
+    return report
+
+
+def main(argv=None):
+    modules = tuple(sys.argv[1:] if argv is None else argv) or DEFAULT_MODULES
+    for entry in import_report(modules):
+        print(f"{entry['module']:<44} {entry['total'] * 1000:8.1f} ms")
+        for name, cumulative in entry["heaviest"]:
+            print(f"    {name:<40} {cumulative * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
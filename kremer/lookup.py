@@ -0,0 +1,129 @@
+"""Tabla precalculada de trayectorias servida desde un archivo mapeado en memoria.
+
+Con paso fijo ``dt`` el esquema de Euler P' = P + k dt P^2 se reduce, con el
+cambio de variable u = k dt P, a u' = u + u^2: la trayectoria depende de
+(g, alpha, P0) solo a través de u0 = k dt P0. Por eso la tabla guarda una
+familia 1-D de trayectorias de log(u) sobre una grilla logarítmica de u0, que
+cubre todas las posiciones de los sliders y cualquier población inicial.
+
+La tabla se construye fuera de línea::
+
+    python -m kremer.lookup [ruta.npy]
+
+y en tiempo de ejecución se abre con ``np.load(..., mmap_mode="r")``, de modo
+que todos los procesos comparten las páginas a través de la caché del SO.
+
+Cerca de la singularidad la interpolación entre filas pierde precisión (más
+del 1 % con u ~ 0.05). Por eso se interpola (cúbica, con cuatro filas)
+solo mientras las filas tienen u ≤ ``U_MAX``, y desde ahí se sigue con Euler
+directo a partir del último valor interpolado: el error relativo frente a
+Euler integrado de punta a punta queda bajo ``MAX_ERROR``.
+"""
+import hashlib
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from kremer.engine import kremer_rate, simulate_batch
+
+DEFAULT_TABLE_PATH = Path(__file__).resolve().parent.parent / "data" / "kremer_lookup.npy"
+DEFAULT_YEARS = np.arange(-10000, 2000, 10)
+DEFAULT_U0_RANGE = (1e-7, 1.0)
+DEFAULT_POINTS = 2048
+U_MAX = 2e-3        # más allá, la trayectoria se integra en lugar de interpolarse
+U_FINAL_MAX = 1.0   # con u mayor al final (casi explota) cualquier error se amplifica
+MAX_ERROR = 1e-4    # cota (medida) del error relativo de la trayectoria servida
+
+
+def _meta_path(path):
+    return Path(path).with_suffix(".meta.npz")
+
+
+def build_lookup_table(path=DEFAULT_TABLE_PATH, years=DEFAULT_YEARS, u0_range=DEFAULT_U0_RANGE,
+                       n_points=DEFAULT_POINTS):
+    """Integra la familia u' = u + u^2 y la guarda como log(u) en float32."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    years = np.asarray(years, dtype=float)
+    dt = np.diff(years)
+    if not np.allclose(dt, dt[0]):
+        raise ValueError("La tabla requiere años equiespaciados.")
+
+    log_u0 = np.linspace(np.log(u0_range[0]), np.log(u0_range[1]), n_points)
+    # Con g = 1/dt y alpha = 0 se tiene k dt = 1, es decir, u' = u + u^2
+    U, stop = simulate_batch(np.exp(log_u0), 1 / dt[0], 0.0, years)
+    with np.errstate(divide="ignore"):
+        table = np.log(U).astype(np.float32)
+
+    np.save(path, table)
+    np.savez(_meta_path(path), years=years, log_u0=log_u0, stop=stop)
+    return path
+
+
+class LookupTable:
+    """Trayectorias de Euler interpoladas a partir de la tabla mapeada."""
+
+    def __init__(self, table, years, log_u0, stop, version=None):
+        self.table = table
+        self.years = years
+        self.log_u0 = log_u0
+        self.stop = stop
+        self.version = version  # identifica la tabla en las claves de caché
+        self.dt = years[1] - years[0]
+        self._step = log_u0[1] - log_u0[0]
+
+    def trajectory(self, P0, g, alpha, years=None):
+        """Devuelve la trayectoria de Euler o ``None`` si no se puede servir.
+
+        Se interpola mientras las filas vecinas tienen u ≤ ``U_MAX`` y el
+        resto se integra con ``simulate_batch``. La tabla no responde (y el
+        llamador debe integrar) cuando los años no coinciden, cuando u0 cae
+        fuera de la grilla o ya supera ``U_MAX``, o cuando la trayectoria
+        explota o termina al borde de explotar (u > ``U_FINAL_MAX``).
+        """
+        if years is not None and not np.array_equal(np.asarray(years, dtype=float), self.years):
+            return None
+        scale = float(kremer_rate(g, alpha)) * self.dt
+        pos = (np.log(scale * P0) - self.log_u0[0]) / self._step
+        if not 0 <= pos <= self.log_u0.size - 1:
+            return None
+
+        # Lagrange cúbico sobre las filas i - 1, ..., i + 2 (nodos -1, 0, 1, 2)
+        i = min(max(int(pos), 1), self.log_u0.size - 3)
+        w = pos - i
+        weights = np.array([-w * (w - 1) * (w - 2) / 6, (w + 1) * (w - 1) * (w - 2) / 2,
+                            -(w + 1) * w * (w - 2) / 2, (w + 1) * w * (w - 1) / 6])
+        rows = np.asarray(self.table[i - 1:i + 3], dtype=float)
+        # u crece en cada fila (y es NaN/inf tras una explosión): primer paso fuera del tramo confiable
+        usable = np.minimum.accumulate(rows.max(axis=0) <= np.log(U_MAX))
+        h = int(usable.sum())
+        if h == 0:
+            return None
+        P = np.exp(weights @ rows[:, :h]) / scale
+        if h == self.years.size:
+            return P
+        rest, stop = simulate_batch(P[-1], g, alpha, self.years[h - 1:])
+        if stop[0] >= 0 or scale * rest[0, -1] > U_FINAL_MAX:
+            return None
+        return np.concatenate([P, rest[0, 1:]])
+
+
+def load_lookup_table(path=DEFAULT_TABLE_PATH):
+    """Abre la tabla en modo mapeado; devuelve ``None`` si aún no se construyó."""
+    path = Path(path)
+    meta_path = _meta_path(path)
+    if not path.exists() or not meta_path.exists():
+        return None
+    with np.load(meta_path) as meta:
+        years, log_u0, stop = meta["years"], meta["log_u0"], meta["stop"]
+    table = np.load(path, mmap_mode="r")
+    # Los metadatos y la forma bastan: la tabla es función determinista de ellos
+    digest = hashlib.sha1(meta_path.read_bytes())
+    digest.update(repr((table.shape, str(table.dtype))).encode())
+    return LookupTable(table, years, log_u0, stop, version=digest.hexdigest()[:16])
+
+
+if __name__ == "__main__":
+    out = build_lookup_table(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_TABLE_PATH)
+    print(f"Tabla guardada en {out}")
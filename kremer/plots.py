@@ -0,0 +1,137 @@
+"""Capa de renderizado: figuras reutilizables y reducción de trayectorias (LTTB).
+
+Una ``ChartTemplate`` crea la figura una sola vez con sus elementos fijos
+(series históricas, ejes, títulos, marcas) y en cada render solo actualiza los
+datos de las líneas simuladas. Las figuras se crean sin ``pyplot``, por lo que
+no quedan registradas en el estado global de matplotlib y su memoria se
+libera junto con la plantilla. matplotlib se importa al crear la primera
+figura, no al importar este módulo.
+"""
+import threading
+from io import BytesIO
+
+import numpy as np
+
+# Puntos máximos por línea antes de reducirla con LTTB
+MAX_POINTS = 800
+PNG_DPI = 200
+
+
+def lttb(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: reduce (x, y) a ``n_out`` puntos conservando la forma.
+
+    Mantiene el primer y el último punto y, en cada cubeta intermedia, el
+    punto que forma el triángulo de mayor área con el punto elegido en la
+    cubeta anterior y el promedio de la siguiente.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = x.size
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    # Promedios de cada cubeta (para el vértice "siguiente" del triángulo)
+    counts = np.diff(edges)
+    x_mean = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    y_mean = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts
+    x_mean = np.append(x_mean, x[-1])
+    y_mean = np.append(y_mean, y[-1])
+
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        xs, ys = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - x_mean[b + 1]) * (ys - y[a]) - (x[a] - xs) * (y_mean[b + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[b + 1] = a
+    return selected
+
+
+def downsample_series(x, y, max_points=MAX_POINTS, log_y=False):
+    """Quita puntos no finitos y reduce con LTTB (en log10 si el eje es logarítmico)."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    finite = np.isfinite(x) & np.isfinite(y)
+    if log_y:
+        finite &= y > 0
+    x, y = x[finite], y[finite]
+    if x.size <= max_points:
+        return x, y
+    idx = lttb(x, np.log10(y) if log_y else y, max_points)
+    return x[idx], y[idx]
+
+
+def new_figure(figsize):
+    """Figura con lienzo Agg propio, sin pasar por ``pyplot``."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def figure_png(fig):
+    """Rasteriza la figura como lo haría ``st.pyplot``."""
+    buf = BytesIO()
+    fig.savefig(buf, format="png", dpi=PNG_DPI, bbox_inches="tight")
+    return buf.getvalue()
+
+
+class ChartTemplate:
+    """Figura con elementos fijos y líneas cuyo contenido se reemplaza en cada render.
+
+    ``build(ax)`` dibuja los elementos fijos una sola vez. Las líneas
+    dinámicas se declaran con ``add_line`` y se llenan en ``render``. Como una
+    plantilla se comparte entre sesiones, ``render`` se serializa con un lock.
+    """
+
+    def __init__(self, figsize, build=None):
+        self.fig = new_figure(figsize)
+        self.ax = self.fig.add_subplot()
+        self.lines = {}
+        self._lock = threading.Lock()
+        if build is not None:
+            build(self.ax)
+        # relim() ignora las colecciones (p. ej. scatter): se guardan los límites fijos
+        self._static_points = self.ax.dataLim.get_points().copy()
+
+    def add_line(self, name, *fmt, **kwargs):
+        (self.lines[name],) = self.ax.plot([], [], *fmt, **kwargs)
+
+    def render(self, series, bands=(), labels=None, legend=True, max_points=MAX_POINTS):
+        """Actualiza las líneas y devuelve el PNG.
+
+        ``series`` mapea nombre de línea a ``(x, y)``; las líneas no
+        incluidas quedan vacías. ``bands`` son tuplas ``(x, bajo, alto,
+        kwargs)`` que se sombrean solo en este render. ``labels`` permite
+        cambiar la etiqueta de leyenda de una línea.
+        """
+        with self._lock:
+            log_y = self.ax.get_yscale() == "log"
+            for name, line in self.lines.items():
+                x, y = series.get(name, ((), ()))
+                line.set_data(*downsample_series(x, y, max_points, log_y))
+                if labels and name in labels:
+                    line.set_label(labels[name])
+            self.ax.relim()
+            if np.isfinite(self._static_points).all():
+                self.ax.update_datalim(self._static_points)
+            temporary = [self.ax.fill_between(x, low, high, **kwargs) for x, low, high, kwargs in bands]
+            self.ax.autoscale_view()
+            legend_artist = None
+            if legend:
+                # Las líneas vacías (p. ej. un ensamble desactivado) no van a la leyenda
+                handles = [h for h in self.ax.get_legend_handles_labels()[0]
+                           if not hasattr(h, "get_xdata") or len(h.get_xdata())]
+                legend_artist = self.ax.legend(handles=handles)
+            try:
+                return figure_png(self.fig)
+            finally:
+                for artist in temporary:
+                    artist.remove()
+                if legend_artist is not None:
+                    legend_artist.remove()
@@ -0,0 +1,114 @@
+"""Medición de tramos (spans) de cada ejecución del script.
+
+Con un ``Profiler`` activo (``activate``), ``span`` y ``profiled`` registran
+nombre, inicio relativo, duración y profundidad de anidamiento, y ``stage``
+cierra una etapa de nivel superior (el tiempo desde la etapa anterior), sin
+tener que envolver bloques enteros del script. Sin perfilador activo,
+``span`` devuelve un contexto vacío compartido y ``stage`` no hace nada: el
+costo es una lectura de ``ContextVar``.
+
+Los registros se exportan como JSON lines para agregarlos fuera de línea.
+"""
+import json
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import wraps
+
+_active = ContextVar("kremer_profiler", default=None)
+_NULL_SPAN = nullcontext()
+
+
+class Profiler:
+    """Registros de una ejecución; ``reset`` empieza una nueva."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.records = []
+        self.started_at = datetime.now(timezone.utc)
+        self._origin = self._last_stage = time.perf_counter()
+        self._depth = 0
+
+    def _record(self, kind, name, start, end, depth):
+        self.records.append({
+            "kind": kind,
+            "name": name,
+            "start_ms": (start - self._origin) * 1000,
+            "duration_ms": (end - start) * 1000,
+            "depth": depth,
+        })
+
+    def stage(self, name):
+        now = time.perf_counter()
+        self._record("stage", name, self._last_stage, now, 0)
+        self._last_stage = now
+
+    def stages(self):
+        return [r for r in self.records if r["kind"] == "stage"]
+
+    def spans(self):
+        # Ordenados por inicio: los tramos internos se cierran (y registran) antes que los externos
+        return sorted((r for r in self.records if r["kind"] == "span"), key=lambda r: r["start_ms"])
+
+    def total_ms(self):
+        return (self._last_stage - self._origin) * 1000
+
+    def to_jsonl(self, **fields):
+        """Una línea JSON por registro; ``fields`` se agrega a cada una (p. ej. la página)."""
+        run = {"run_started": self.started_at.isoformat(timespec="milliseconds"), **fields}
+        return "".join(json.dumps({**run, **record}) + "\n" for record in self.records)
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "start", "depth")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.depth = self.profiler._depth
+        self.profiler._depth += 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.profiler._depth -= 1
+        self.profiler._record("span", self.name, self.start, end, self.depth)
+        return False
+
+
+def activate(profiler):
+    """Fija el perfilador del hilo actual (``None`` lo desactiva)."""
+    _active.set(profiler)
+
+
+def span(name):
+    """Contexto que mide un tramo si hay un perfilador activo."""
+    profiler = _active.get()
+    return _NULL_SPAN if profiler is None else _Span(profiler, name)
+
+
+def stage(name):
+    """Cierra la etapa ``name`` del perfilador activo, si lo hay."""
+    profiler = _active.get()
+    if profiler is not None:
+        profiler.stage(name)
+
+
+def profiled(name):
+    """Decorador: mide cada llamada a la función como un tramo ``name``."""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _active.get()
+            if profiler is None:
+                return func(*args, **kwargs)
+            with _Span(profiler, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,201 @@
+"""Sensibilidad de las trayectorias a g, alpha y la población inicial.
+
+Sensibilidades hacia adelante: junto con cada paso de Euler
+
+    P' = P + k P^2 dt,    k = g / (1 - alpha)
+
+se integra su derivada respecto de cada parámetro θ,
+
+    S' = (1 + 2 k P dt) S + P^2 dt ∂k/∂θ,
+
+con S(0) = 0 para g y alpha y S(0) = 1 para P0; el resultado es exacto para
+la trayectoria discreta que dibuja la app, en la misma pasada y para muchos
+escenarios a la vez.
+
+Índices de Sobol: varianza de log P(t) explicada por cada parámetro, con
+los estimadores de Saltelli et al. (2010) (efecto de primer orden) y de
+Jansen (1999) (efecto total). Necesitan N (d + 2) evaluaciones del modelo
+sobre dos matrices de muestras A y B; se toman de una secuencia de Sobol
+(Joe y Kuo, 2008) con desplazamiento digital aleatorio y se integran por
+bloques con ``simulate_batch``.
+"""
+import numpy as np
+
+from kremer.engine import (P_CAP, P_FLOOR, apply_demographic_transition, as_scenarios, demographic_reduction,
+                           kremer_rate, simulate_batch)
+
+PARAMETERS = ("g", "alpha", "P0")
+CHUNK_SIZE = 8192
+
+# Números de dirección de Joe y Kuo (new-joe-kuo-6.21201) para las dimensiones 2..8:
+# grado s del polinomio primitivo, sus coeficientes a y los m_1..m_s iniciales
+_JOE_KUO = [
+    (1, 0, (1,)),
+    (2, 1, (1, 3)),
+    (3, 1, (1, 3, 1)),
+    (3, 2, (1, 1, 1)),
+    (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)),
+    (5, 2, (1, 1, 5, 5, 17)),
+]
+_BITS = 32
+
+
+def forward_sensitivities(P0, g, alpha, years, floor=P_FLOOR, transition_start=None):
+    """Trayectorias de Euler y sus derivadas respecto de (g, alpha, P0).
+
+    Como ``simulate_batch``, una trayectoria que explota se congela; desde
+    ese paso sus derivadas son NaN. Con ``transition_start`` la transición
+    demográfica se aplica después, como en la simulación global de la app
+    (``apply_demographic_transition``), y las derivadas la siguen.
+
+    Devuelve ``(P, S, stop)`` con ``S`` de forma (parámetro × escenario × tiempo).
+    """
+    P0, g, alpha = as_scenarios(P0, g, alpha)
+    years = np.asarray(years, dtype=float)
+    k = kremer_rate(g, alpha)
+    dk = np.stack([1 / (1 - alpha), g / (1 - alpha) ** 2, np.zeros_like(g)])
+    dts = np.diff(years)
+
+    P = np.empty((P0.size, years.size))
+    S = np.empty((len(PARAMETERS), P0.size, years.size))
+    P[:, 0] = P0
+    S[:, :, 0] = [np.zeros_like(P0), np.zeros_like(P0), np.ones_like(P0)]
+    stop = np.full(P0.size, -1)
+    active = np.ones(P0.size, dtype=bool)
+
+    with np.errstate(over="ignore", invalid="ignore"):
+        for i in range(1, years.size):
+            prev, dt = P[:, i - 1], dts[i - 1]
+            new = prev + k * prev**2 * dt
+            S_new = (1 + 2 * k * prev * dt) * S[:, :, i - 1] + prev**2 * dt * dk
+
+            blown = active & ~(np.isfinite(new) & np.isfinite(S_new).all(axis=0))
+            stop[blown] = i
+            active &= ~blown
+            floored = new < floor
+            P[:, i] = np.where(active, np.maximum(new, floor), prev)
+            S[:, :, i] = np.where(active & ~floored, S_new, np.where(active, 0.0, np.nan))
+
+    if transition_start is not None:
+        P, S = _transition(P, S, stop, years, transition_start)
+    return P, S, stop
+
+
+def _transition(P, S, stop, years, start):
+    # apply_demographic_transition encadena sobre los valores ya corregidos:
+    # log P_i = (1 - r_i) log P_(i-1) + r_i log R_i, con R la trayectoria cruda,
+    # y la derivada de log P sigue la misma recursión lineal
+    ok = stop < 0
+    P_out = P.copy()
+    P_out[ok] = apply_demographic_transition(P[ok], years, start=start)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        L_raw = S[:, ok] / P[ok]
+    L = L_raw.copy()
+    reduction = demographic_reduction(years, start)
+    for i in np.flatnonzero(years >= start):
+        if i > 0:
+            L[:, :, i] = (1 - reduction[i]) * L[:, :, i - 1] + reduction[i] * L_raw[:, :, i]
+    S_out = S.copy()
+    S_out[:, ok] = L * P_out[ok]
+    return P_out, S_out
+
+
+def elasticities(P, S, P0, g, alpha):
+    """Elasticidades θ/P · ∂P/∂θ: cambio porcentual de P por cada 1 % del parámetro."""
+    theta = np.stack(as_scenarios(g, alpha, P0))[:, :, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return theta * S / P
+
+
+def _direction_numbers(dims):
+    V = np.empty((dims, _BITS), dtype=np.uint64)
+    V[0] = [1 << (_BITS - 1 - j) for j in range(_BITS)]
+    for d in range(1, dims):
+        s, a, m_init = _JOE_KUO[d - 1]
+        m = list(m_init)
+        for j in range(s, _BITS):
+            value = m[j - s] ^ (m[j - s] << s)
+            for bit in range(1, s):
+                if (a >> (s - 1 - bit)) & 1:
+                    value ^= m[j - bit] << bit
+            m.append(value)
+        V[d] = [m[j] << (_BITS - 1 - j) for j in range(_BITS)]
+    return V
+
+
+def sobol_points(n, dims, seed=None):
+    """``n`` puntos de Sobol en [0, 1)^dims, en orden de código Gray.
+
+    Con ``seed`` se aplica un desplazamiento digital aleatorio (XOR), que
+    conserva la estructura de la secuencia y permite repetir la estimación
+    con otra aleatorización.
+    """
+    if dims > len(_JOE_KUO) + 1:
+        raise ValueError(f"Hasta {len(_JOE_KUO) + 1} dimensiones.")
+    V = _direction_numbers(dims)
+    index = np.arange(n, dtype=np.uint64)
+    gray = index ^ (index >> np.uint64(1))
+    X = np.zeros((n, dims), dtype=np.uint64)
+    for j in range(_BITS):
+        bit = ((gray >> np.uint64(j)) & np.uint64(1)).astype(bool)
+        X[bit] ^= V[:, j]
+    if seed is not None:
+        shift = np.random.default_rng(seed).integers(0, 1 << _BITS, dims, dtype=np.uint64)
+        X ^= shift
+    return X.astype(float) / 2.0**_BITS
+
+
+def saltelli_samples(bounds, n, seed=0):
+    """Matrices A, B y las A_B^(i) (A con la columna i de B), apiladas: (d + 2) n filas."""
+    bounds = np.asarray(bounds, dtype=float)
+    d = len(bounds)
+    U = sobol_points(n, 2 * d, seed)
+    A = bounds[:, 0] + U[:, :d] * (bounds[:, 1] - bounds[:, 0])
+    B = bounds[:, 0] + U[:, d:] * (bounds[:, 1] - bounds[:, 0])
+    blocks = [A, B]
+    for i in range(d):
+        AB = A.copy()
+        AB[:, i] = B[:, i]
+        blocks.append(AB)
+    return np.concatenate(blocks)
+
+
+def model_outputs(params, years, output_index, transition_start=None, chunk_size=CHUNK_SIZE):
+    """log P en los años ``years[output_index]`` para cada fila (g, alpha, P0), por bloques."""
+    years = np.asarray(years, dtype=float)
+    out = np.empty((len(params), len(output_index)))
+    for lo in range(0, len(params), chunk_size):
+        g, alpha, P0 = params[lo:lo + chunk_size].T
+        # Con tope: las trayectorias que explotan quedan acotadas en log P_CAP
+        P, stop = simulate_batch(P0, g, alpha, years, cap=P_CAP)
+        if transition_start is not None:
+            ok = stop < 0
+            P[ok] = apply_demographic_transition(P[ok], years, start=transition_start)
+        out[lo:lo + chunk_size] = np.log(P[:, output_index])
+    return out
+
+
+def sobol_indices(bounds, years, n=4096, output_index=None, transition_start=None, seed=0):
+    """Índices de Sobol de primer orden y totales de log P(t) para (g, alpha, P0).
+
+    ``bounds`` da el rango (uniforme) de cada parámetro, en el orden de
+    ``PARAMETERS``. Devuelve un dict con ``first`` y ``total`` (parámetro ×
+    año), ``years``, ``variance`` y ``evaluations``.
+    """
+    years = np.asarray(years, dtype=float)
+    output_index = np.arange(years.size) if output_index is None else np.asarray(output_index)
+    d = len(bounds)
+    Y = model_outputs(saltelli_samples(bounds, n, seed), years, output_index, transition_start)
+    Y = Y.reshape(d + 2, n, -1)
+    f_A, f_B, f_AB = Y[0], Y[1], Y[2:]
+
+    variance = np.var(np.concatenate([f_A, f_B]), axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        first = np.mean(f_B * (f_AB - f_A), axis=1) / variance
+        total = 0.5 * np.mean((f_A - f_AB) ** 2, axis=1) / variance
+    no_variance = variance <= 1e-12 * np.maximum(np.abs(f_A).mean(axis=0), 1)
+    first[:, no_variance] = np.nan
+    total[:, no_variance] = np.nan
+    return {"first": first, "total": total, "years": years[output_index], "variance": variance,
+            "evaluations": len(Y.reshape(-1, output_index.size))}
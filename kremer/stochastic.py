@@ -0,0 +1,121 @@
+"""Versión estocástica del modelo: innovaciones como eventos de Poisson y pérdida de tecnología.
+
+La tecnología es un acervo de ``n`` técnicas; cada una multiplica A por
+``exp(delta)`` y la población malthusiana acompaña a la tecnología:
+
+    P = P0 · exp(delta (n - n0) / (1 - alpha))
+
+- Las innovaciones llegan a tasa ``g P / delta`` por año, de modo que en
+  promedio d ln A / dt = g P y d ln P / dt = k P, como en el modelo
+  determinista (al que se tiende con ``delta`` pequeño).
+- Cada técnica se olvida a tasa ``loss_rate · loss_scale / (loss_scale + P)``:
+  casi ``loss_rate`` en poblaciones chicas, despreciable en las grandes
+  (la transmisión imperfecta entre pocos aprendices; Henrich, 2004).
+- Ruido demográfico: la población fluctúa alrededor de ese nivel,
+  P = P_tec · exp(x), con x un proceso de Ornstein–Uhlenbeck que vuelve a 0
+  a tasa ``recovery`` y cuya varianza por año es ``demographic_var / N``
+  (N = personas): nacimientos y muertes al azar pesan en poblaciones chicas.
+- Sin ninguna técnica la población no se sostiene y se extingue.
+
+Se integra con tau-leaping binomial: en cada paso ``dt`` todas las réplicas
+sortean a la vez las innovaciones (Poisson) y las pérdidas (binomial sobre
+las técnicas conocidas, que nunca quedan negativas), sin recorrer evento por
+evento. Una réplica se extingue cuando su población cae bajo ``extinction``
+(100 personas) o pierde todas sus técnicas, y queda fija cuando supera ``cap``.
+"""
+import numpy as np
+
+from kremer.engine import P_CAP, as_scenarios
+
+DEFAULT_PERCENTILES = (5, 50, 95)
+DELTA = 0.01
+N_SKILLS = 50
+LOSS_RATE = 1e-4
+LOSS_SCALE = 1e-5       # población (billones) a la que la pérdida se reduce a la mitad
+EXTINCTION = 1e-7       # 100 personas
+DEMOGRAPHIC_VAR = 0.05  # nacimientos + muertes por persona y año
+RECOVERY = 0.01         # vuelta al nivel malthusiano (por año)
+PEOPLE = 1e9            # personas por unidad de P (billones)
+
+
+def simulate_stochastic(P0, g, alpha, years, replicas=10_000, delta=DELTA, n_skills=N_SKILLS,
+                        loss_rate=LOSS_RATE, loss_scale=LOSS_SCALE, extinction=EXTINCTION, cap=P_CAP,
+                        demographic_var=DEMOGRAPHIC_VAR, recovery=RECOVERY,
+                        percentiles=DEFAULT_PERCENTILES, record_every=1, seed=0):
+    """Corre ``replicas`` trayectorias por región (un valor de ``P0`` por región).
+
+    Las estadísticas por año se guardan cada ``record_every`` pasos (y en el
+    último). Devuelve un dict con ``years`` (los años guardados) y, por región:
+
+    - ``bands``: percentiles de P (percentil × región × año guardado);
+    - ``extinct``: fracción de réplicas extinguidas (región × año guardado);
+    - ``tech_loss``: fracción que termina con menos técnicas que al inicio;
+    - ``mean_innovations`` y ``mean_losses``: eventos por réplica.
+    """
+    P0, g, alpha = as_scenarios(P0, g, alpha)
+    years = np.asarray(years, dtype=float)
+    n_regions = P0.size
+    rng = np.random.default_rng(seed)
+
+    # Réplicas de todas las regiones en vectores planos: región r ocupa [r·replicas, (r+1)·replicas)
+    base = np.repeat(P0, replicas)
+    g_r = np.repeat(g, replicas)
+    growth = np.repeat(delta / (1 - alpha), replicas)
+    n = np.full(base.size, n_skills, dtype=np.int64)
+    x = np.zeros(base.size)  # log de P sobre su nivel malthusiano
+    P = base.copy()
+    alive = np.ones(base.size, dtype=bool)
+    frozen = np.zeros(base.size, dtype=bool)
+    innovations = np.zeros(base.size, dtype=np.int64)
+    losses = np.zeros(base.size, dtype=np.int64)
+
+    recorded = np.unique(np.append(np.arange(0, years.size, record_every), years.size - 1))
+    bands = np.empty((len(percentiles), n_regions, recorded.size))
+    extinct = np.empty((n_regions, recorded.size))
+
+    def record(j):
+        bands[:, :, j] = np.percentile(P.reshape(n_regions, replicas), percentiles, axis=1)
+        extinct[:, j] = (~alive).reshape(n_regions, replicas).mean(axis=1)
+
+    record(0)
+    j = 1
+    for i in range(1, years.size):
+        dt = years[i] - years[i - 1]
+        # Solo se sortean eventos para las réplicas vivas y bajo el tope
+        idx = np.flatnonzero(alive & ~frozen)
+        if idx.size:
+            P_a, n_a, x_a = P[idx], n[idx], x[idx]
+            gained = rng.poisson(g_r[idx] * P_a / delta * dt)
+            lost = rng.binomial(n_a, -np.expm1(-loss_rate * loss_scale / (loss_scale + P_a) * dt))
+            n_a += gained - lost
+            n[idx] = n_a
+            innovations[idx] += gained
+            losses[idx] += lost
+            # Paso exacto de Ornstein–Uhlenbeck con la varianza del tamaño actual
+            decay = np.exp(-recovery * dt)
+            x_a = x_a * decay + np.sqrt(demographic_var / (P_a * PEOPLE) * -np.expm1(-2 * recovery * dt)
+                                        / (2 * recovery)) * rng.standard_normal(idx.size)
+            x[idx] = x_a
+            P_a = base[idx] * np.exp(growth[idx] * (n_a - n_skills) + x_a)
+
+            dead = (P_a < extinction) | (n_a == 0)
+            alive[idx[dead]] = False
+            P_a[dead] = 0.0
+            capped = P_a >= cap
+            frozen[idx[capped]] = True
+            P_a[capped] = cap
+            P[idx] = P_a
+        if j < recorded.size and recorded[j] == i:
+            record(j)
+            j += 1
+
+    per_region = (n_regions, replicas)
+    return {
+        "years": years[recorded],
+        "bands": bands,
+        "percentiles": tuple(percentiles),
+        "extinct": extinct,
+        "tech_loss": (n < n_skills).reshape(per_region).mean(axis=1),
+        "mean_innovations": innovations.reshape(per_region).mean(axis=1),
+        "mean_losses": losses.reshape(per_region).mean(axis=1),
+    }
@@ -0,0 +1,212 @@
+"""Caché de resultados en disco, compartida entre sesiones, procesos y reinicios.
+
+``st.cache_data`` vive en la memoria del servidor: tras un reinicio, los
+primeros usuarios vuelven a pagar la simulación y las figuras de los valores
+por defecto. ``persistent`` agrega detrás de esa caché una base SQLite
+(``data/result_store.sqlite``) con los resultados serializados, indexados
+por un hash de:
+
+- la versión del modelo (el código fuente de ``kremer/`` y de la app:
+  plantillas de gráficos, constantes y años del script y de ``pages/``),
+- el código de la función cacheada,
+- sus argumentos.
+
+Cambiar el motor o la función invalida sus entradas sin borrar nada a mano.
+SQLite en modo WAL permite lecturas concurrentes y serializa las escrituras
+entre procesos; si la base supera ``max_bytes`` se desalojan las entradas
+usadas hace más tiempo. Cualquier error de la base se ignora: el resultado
+se calcula como si no hubiera caché.
+
+``KREMER_RESULT_STORE`` cambia la ruta de la base (``off`` la desactiva).
+Para poblarla antes de abrir el servidor (valores por defecto y los del
+botón 🎯, con cada motor)::
+
+    python -m kremer.store --warm
+    python -m kremer.store --stats
+"""
+import argparse
+import hashlib
+import inspect
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from functools import lru_cache, wraps
+from pathlib import Path
+
+DEFAULT_STORE_PATH = Path(__file__).resolve().parent.parent / "data" / "result_store.sqlite"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+APP_SCRIPT = Path(__file__).resolve().parent.parent / "kremer_sim.py"
+ENGINE_MODES = ("Numérico (Euler)", "Analítico (exacto)", "Adaptativo (RK45)", "Generalizado (A, P, y)")
+
+
+@lru_cache(maxsize=None)
+def model_version():
+    """Hash del código del paquete y de la app: cambia con cualquier cambio del motor o de las figuras.
+
+    Las funciones cacheadas dependen también de código que no es el suyo
+    (plantillas de gráficos, ``years_sim``, constantes del script), así que
+    entra el script completo y sus páginas.
+    """
+    digest = hashlib.sha1()
+    package = Path(__file__).resolve().parent
+    sources = sorted(package.glob("*.py")) + [APP_SCRIPT] + sorted(APP_SCRIPT.parent.glob("pages/*.py"))
+    for path in filter(Path.exists, sources):
+        digest.update(path.relative_to(package.parent).as_posix().encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+class ResultStore:
+    """Tabla clave → resultado serializado, con desalojo LRU por tamaño total."""
+
+    def __init__(self, path=DEFAULT_STORE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+    def _connect(self):
+        # Una conexión por hilo: Streamlit atiende cada sesión en su propio hilo
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY, name TEXT, value BLOB, size INTEGER, accessed REAL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """El resultado guardado bajo ``key``, o ``None``."""
+        conn = self._connect()
+        row = conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+        return pickle.loads(row[0])
+
+    def put(self, key, name, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        conn = self._connect()
+        conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                     (key, name, blob, len(blob), time.time()))
+        self.evict()
+
+    def evict(self):
+        """Borra las entradas menos usadas hasta quedar bajo ``max_bytes``."""
+        # Una sola sentencia (atómica): dos procesos que desalojan a la vez no borran de más
+        return self._connect().execute("""
+            DELETE FROM results WHERE key IN (
+                SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed DESC, key) AS kept FROM results)
+                WHERE kept > ?)""", (self.max_bytes,)).rowcount
+
+    def stats(self):
+        """Entradas y bytes por función."""
+        rows = self._connect().execute(
+            "SELECT name, COUNT(*), SUM(size) FROM results GROUP BY name ORDER BY name").fetchall()
+        return {name: {"entries": count, "bytes": size} for name, count, size in rows}
+
+    def clear(self):
+        self._connect().execute("DELETE FROM results")
+
+
+@lru_cache(maxsize=None)
+def default_store():
+    """La base de ``KREMER_RESULT_STORE`` (o la ruta por defecto); ``None`` si está desactivada."""
+    path = os.environ.get("KREMER_RESULT_STORE", str(DEFAULT_STORE_PATH))
+    if path.lower() in ("", "0", "off", "none"):
+        return None
+    return ResultStore(path)
+
+
+def _source_hash(func):
+    try:
+        source = inspect.getsource(func).encode()
+    except (OSError, TypeError):
+        source = func.__code__.co_code
+    return hashlib.sha1(source).hexdigest()[:16]
+
+
+def persistent(func):
+    """Decorador: consulta la base en disco antes de llamar a ``func``.
+
+    Va debajo de ``st.cache_data``, que sigue siendo la primera capa; los
+    argumentos y el resultado deben poder serializarse con ``pickle``.
+    """
+    prefix = f"{func.__module__}.{func.__qualname__}|{_source_hash(func)}"
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        store = default_store()
+        if store is None:
+            return func(*args, **kwargs)
+        try:
+            raw = pickle.dumps((model_version(), prefix, args, sorted(kwargs.items())), protocol=4)
+            key = hashlib.sha256(raw).hexdigest()
+            value = store.get(key)
+        except (sqlite3.Error, OSError, pickle.PickleError, AttributeError, TypeError):
+            return func(*args, **kwargs)
+        if value is None:
+            value = func(*args, **kwargs)
+            try:
+                store.put(key, func.__qualname__, value)
+            except (sqlite3.Error, OSError, pickle.PickleError, AttributeError, TypeError):
+                pass
+        return value
+    return wrapper
+
+
+def warm(engines=ENGINE_MODES, log=None):
+    """Corre la app sin navegador con los valores por defecto y los del botón 🎯.
+
+    Cada ejecución pasa por las mismas funciones cacheadas que un usuario,
+    así que sus resultados quedan en la base.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    os.chdir(APP_SCRIPT.parent)  # la app abre sus imágenes con rutas relativas
+    for engine in engines:
+        for calibrated in (False, True):
+            start = time.perf_counter()
+            app = AppTest.from_file(str(APP_SCRIPT), default_timeout=600).run()
+            if calibrated:
+                next(b for b in app.button if b.label.startswith("🎯")).click().run()
+            app.radio(key="engine_mode").set_value(engine).run()
+            if app.exception:
+                raise RuntimeError(f"La app falló con {engine}: {app.exception[0].message}")
+            if log is not None:
+                label = "calibrados" if calibrated else "por defecto"
+                log(f"{engine:<24} {label:<12} {time.perf_counter() - start:6.1f} s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Caché de resultados en disco de la app.")
+    parser.add_argument("--warm", action="store_true", help="precalcula los escenarios por defecto y calibrados")
+    parser.add_argument("--engine", choices=ENGINE_MODES, action="append",
+                        help="motor a precalcular (por defecto, todos)")
+    parser.add_argument("--stats", action="store_true", help="muestra entradas y tamaño por función")
+    parser.add_argument("--clear", action="store_true", help="vacía la base")
+    args = parser.parse_args(argv)
+
+    store = default_store()
+    if store is None:
+        print("La caché en disco está desactivada (KREMER_RESULT_STORE).", file=sys.stderr)
+        return 2
+    if args.clear:
+        store.clear()
+    if args.warm:
+        warm(args.engine or ENGINE_MODES, log=print)
+    if args.stats or not (args.clear or args.warm):
+        for name, info in store.stats().items():
+            print(f"{name:<32} {info['entries']:6d} entradas {info['bytes'] / 1e6:10.2f} MB")
+        print(f"Base: {store.path} (modelo {model_version()})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,62 @@
 import streamlit as st
 import numpy as np
-import matplotlib.pyplot as plt
-import pandas as pd
-
-# Datos históricos del paper (Tabla I)
-data = {
-    "Year": [-1_000_000, -300_000, -25_000, -10_000, -5000, -4000, -3000, -2000, -1000,
-             -500, -200, 1, 200, 400, 600, 800, 1000, 1100, 1200, 1300, 1400, 1500,
-             1600, 1650, 1700, 1750, 1800, 1850, 1875, 1900, 1920, 1930, 1940, 1950,
-             1960, 1970, 1980, 1990],
-    "Pop_millions": [0.125, 1, 3.34, 4, 5, 7, 14, 27, 50, 100, 150, 170, 190, 190, 200,
-                     220, 265, 320, 360, 360, 350, 425, 545, 545, 610, 720, 900,
-                     1200, 1325, 1625, 1813, 1987, 2213, 2516, 3019, 3693, 4450, 5333]
-}
-df_hist = pd.DataFrame(data)
-df_hist["Pop"] = df_hist["Pop_millions"] / 1000  # en billones
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from kremer.adaptive import simulate_adaptive
+from kremer.calibration import calibrate
+from kremer.data import table_i
+from kremer.ensemble import run_ensemble
+from kremer.engine import (analytic_batch, apply_demographic_transition, kremer_fertility, relative_drift,
+                           simulate_batch, simulate_generalized)
+from kremer.export import MIME_TYPES, available_formats, export_scenario, write_ensemble
+from kremer.frames import HEIGHT as FRAMES_HEIGHT, encode_frames, frames_html, scenario_frames, slider_values
+from kremer.graph import SeriesGraph
+from kremer.lookup import MAX_ERROR as LOOKUP_MAX_ERROR, load_lookup_table
+from kremer.plots import ChartTemplate, figure_png, new_figure
+from kremer.profiling import Profiler, activate, profiled, span, stage
+from kremer.regions import simulate_regions
+from kremer.sensitivity import PARAMETERS, elasticities, forward_sensitivities, sobol_indices
+from kremer.stochastic import simulate_stochastic
+from kremer.store import persistent
+
+# === Perfilado opcional (panel de depuración en la barra lateral) ===
+# Apagado, cada tramo cuesta una lectura de ContextVar
+profiling_on = st.sidebar.checkbox("🐞 Perfilado de la ejecución", False, key="profiling_on")
+profiler = None
+if profiling_on:
+    profiler = st.session_state.setdefault("profiler", Profiler())
+    profiler.reset()
+activate(profiler)
+
+# Formato de los botones de descarga de cada sección
+st.sidebar.selectbox("💾 Formato de descarga", available_formats(), key="export_format",
+                     help="En Parquet y NPZ las poblaciones se guardan como logaritmo natural en float32; "
+                          "en CSV, como valores.")
+
+# Gráfico de evolución global dibujado en el navegador: sus propios sliders de g y α
+# recorren cuadros precalculados sin ejecutar nada en el servidor
+st.sidebar.checkbox("⚡ Gráfico interactivo en el navegador", False, key="client_frames",
+                    help="Envía una vez las trayectorias de todas las posiciones de g y α (unos 30 kB) "
+                         "y las recorre sin esperar al servidor. Usa el motor de Euler.")
+
+# Datos históricos del paper (Tabla I), cargados una vez por proceso
+df_hist = table_i()
+
+# === Caché de simulaciones y figuras ===
+# Cada combinación de parámetros se calcula una sola vez por servidor; el límite
+# de entradas (desalojo LRU) evita que un servidor de larga duración crezca sin control.
+# Detrás de st.cache_data, @persistent guarda los resultados en disco (kremer.store)
+# para que sobrevivan a los reinicios del servidor.
+SIM_CACHE_ENTRIES = 256
+FIG_CACHE_ENTRIES = 128
+ENSEMBLE_CACHE_ENTRIES = 16
+ENSEMBLE_PROCESSES = os.cpu_count()
+ENSEMBLE_POOL_MIN_DRAWS = 20_000  # por debajo, el ensamble corre en el proceso del servidor
+
 
 st.title("Simulación del Modelo de Kremer (1993)")
 with st.expander("ℹ️ Contexto teórico del modelo"):
@@ -88,163 +130,653 @@ if "P0_old_input" not in st.session_state:
 if "P0_tas_input" not in st.session_state:
     st.session_state["P0_tas_input"] = 0.004
 
+# Límites de los controles de parámetros; la calibración ajusta sus valores a ellos
+G_RANGE = (0.001, 0.02, 0.001)      # mínimo, máximo y paso del slider de g
+ALPHA_RANGE = (0.5, 0.9, 0.05)
+POP0_RANGE = (0.0001, 0.1)          # mínimo y máximo de la población inicial global
+
+# === Calibración automática contra la Tabla I ===
+@st.cache_data(max_entries=SIM_CACHE_ENTRIES, show_spinner=False)
+@persistent
+def run_calibration(alpha, window):
+    return calibrate(df_hist["Year"], df_hist["Pop"], alpha=alpha, window=window)
+
+
+def calibration_outside(fit):
+    # Parámetros ajustados que los controles no pueden mostrar
+    outside = []
+    if not G_RANGE[0] <= fit["g"] <= G_RANGE[1]:
+        outside.append(f"g = {fit['g']:.5f} (slider de {G_RANGE[0]} a {G_RANGE[1]})")
+    if not POP0_RANGE[0] <= fit["P0"] <= POP0_RANGE[1]:
+        outside.append(f"población inicial = {fit['P0']:.5f} (entre {POP0_RANGE[0]} y {POP0_RANGE[1]})")
+    return outside
+
+
+def apply_calibration():
+    fit = st.session_state["calibration"]
+    st.session_state["g_slider"] = float(np.clip(fit["g"], *G_RANGE[:2]))
+    st.session_state["pop0_global_input"] = float(np.clip(fit["P0"], *POP0_RANGE))
+
+
+with st.expander("🔧 Calibración automática contra la Tabla I"):
+    st.markdown("""
+    Busca los valores de **`g`** y de la **población inicial** que minimizan el error cuadrático en logaritmos
+    entre la simulación y los datos históricos, para el **`α`** elegido. Como la dinámica depende solo de
+    $k = g / (1 - α)$, `g` y `α` no se pueden ajustar por separado.
+    """)
+    calib_end = st.select_slider(
+        "Ajustar desde -10,000 hasta el año",
+        options=[int(y) for y in df_hist["Year"] if y > -10000],
+        value=1950,
+        key="calib_end_input"
+    )
+    if st.button("Ajustar parámetros"):
+        with st.spinner("Evaluando candidatos..."):
+            st.session_state["calibration"] = run_calibration(st.session_state["alpha_slider"], (-10000, calib_end))
+
+    if "calibration" in st.session_state:
+        fit = st.session_state["calibration"]
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("g ajustado", f"{fit['g']:.5f}")
+        c2.metric("Población inicial", f"{fit['P0']:.4f}")
+        c3.metric("Error (log, RMSE)", f"{np.sqrt(fit['loss']):.3f}")
+        c4.metric("Tiempo de ajuste", f"{fit['elapsed']:.2f} s")
+        st.caption(f"{fit['n_evaluated']:,} candidatos evaluados con α = {fit['alpha']:.2f} (k = {fit['k']:.5f}).")
+        st.dataframe({"Año": fit["years"], "Residuo log(observado / simulado)": fit["residuals"]})
+        outside = calibration_outside(fit)
+        if outside:
+            st.warning("⚠️ El ajuste queda fuera del rango de los controles: " + "; ".join(outside)
+                       + ". Al aplicarlo se usará el valor más cercano dentro del rango, que ya no es el óptimo.")
+        st.button("Aplicar parámetros ajustados", on_click=apply_calibration)
+
 # Parámetros interactivos (usan las mismas claves)
 col1, col2 = st.columns(2)
 with col1:
     g = st.slider(
         "Productividad de investigación (g)",
-        min_value=0.001,
-        max_value=0.02,
+        min_value=G_RANGE[0],
+        max_value=G_RANGE[1],
         value=st.session_state["g_slider"],
-        step=0.001,
+        step=G_RANGE[2],
         key="g_slider"
     )
     alpha = st.slider(
         "Parámetro α (elasticidad tierra)",
-        min_value=0.5,
-        max_value=0.9,
+        min_value=ALPHA_RANGE[0],
+        max_value=ALPHA_RANGE[1],
         value=st.session_state["alpha_slider"],
-        step=0.05,
+        step=ALPHA_RANGE[2],
         key="alpha_slider"
     )
 with col2:
     include_dem_trans = st.checkbox("Incluir transición demográfica (post-1950)", True)
     pop0_global = st.number_input(
         "Población inicial global (billones) en -10,000",
-        min_value=0.0001,
-        max_value=0.1,
+        min_value=POP0_RANGE[0],
+        max_value=POP0_RANGE[1],
         value=st.session_state["pop0_global_input"],
         step=0.001,
         format="%.4f",
         key="pop0_global_input"
     )
 
+engine_mode = st.radio(
+    "Motor de simulación",
+    ["Numérico (Euler)", "Analítico (exacto)", "Adaptativo (RK45)", "Generalizado (A, P, y)"],
+    horizontal=True,
+    key="engine_mode",
+    help="El motor analítico evalúa la solución cerrada P(t) = P0 / (1 - k P0 t) y calcula el año exacto de la singularidad. "
+         "El adaptativo (Dormand–Prince) ajusta el paso según el error y se detiene al cruzar el tope de población. "
+         "El generalizado integra tecnología, población e ingreso con la curva n(y) de la Figura II: "
+         "la transición demográfica surge del propio modelo."
+)
+
 # Validación visual
 if pop0_global < 0.001:
     st.warning("⚠️ Población inicial muy baja (<1 millón). El crecimiento será extremadamente lento.")
 
+stage("parámetros")
+
 # === Simulación global ===
 years_sim = np.arange(-10000, 2000, 10) 
-P_global = np.full_like(years_sim, pop0_global, dtype=float) 
-dt = 10
-
-# Integración numérica robusta con detección de explosión
-explosion_detected = False
-for i in range(1, len(years_sim)):
-    dPdt = (g / (1 - alpha)) * P_global[i-1]**2
-    P_global[i] = P_global[i-1] + dPdt * dt
-    
-    if np.isinf(P_global[i]) or np.isnan(P_global[i]):
-        st.warning(f"⚠️ Explosión detectada en el año {int(years_sim[i])}. La población creció demasiado rápido.")
-        explosion_detected = True
-        for j in range(i, len(years_sim)):
-            P_global[j] = P_global[i-1]
-        break
-
-    if P_global[i] <= 0:
-        P_global[i] = 1e-12
-
-# Aplicar transición demográfica suave (solo después de 1950)
-if include_dem_trans and not explosion_detected:
-    for i, y in enumerate(years_sim):
-        if y >= 1950:
-            years_since_1950 = y - 1950
-            reduction_factor = max(0.2, 1 - 0.015 * years_since_1950)
-            if i > 0:
-                current_growth = np.log(P_global[i] / P_global[i-1])
-                adjusted_growth = current_growth * reduction_factor
-                P_global[i] = P_global[i-1] * np.exp(adjusted_growth)
-
-with st.expander("ℹ️ Evidencia I"):
-    # imgen de ayuda del crecimiento poblacional
-    st.image("assets/Marcha.jpg", caption="Figura 1. Tasa de crecimiento vs población en años", width=600)
 
-# === Gráfico 1: Visión general (todo el rango) ===
-fig1_general, ax1_general = plt.subplots(figsize=(8, 4))
-ax1_general.plot(df_hist["Year"], df_hist["Pop"], 'o-', label="Datos históricos (Kremer)", color="black", markersize=3)
-ax1_general.plot(years_sim, P_global, '-', label="Simulación global", color="red")
-ax1_general.set_yscale("log")
-ax1_general.set_xlabel("Año (negativo = A.C., positivo = D.C.)")
-ax1_general.set_ylabel("Población (billones)")
-ax1_general.set_title("Evolución global de la población (visión general)")
 
-ax1_general.set_xticks([-1000000, -500000, -100000, -10000, 0, 1000, 2000])
-ax1_general.set_xticklabels(["-1M", "-500K", "-100K", "-10K", "0", "1K", "2K"], rotation=45)
+@st.cache_resource
+def get_lookup_table():
+    # Tabla precalculada (python -m kremer.lookup); None si no se construyó
+    return load_lookup_table()
+
+
+def lookup_version():
+    # Entra en la clave de run_base_simulation: en modo Euler el resultado
+    # cambia (integrado o interpolado) según haya o no tabla
+    lookup = get_lookup_table()
+    return None if lookup is None else lookup.version
+
+
+@profiled("simulación global")
+@st.cache_data(max_entries=SIM_CACHE_ENTRIES, show_spinner=False)
+@persistent
+def run_base_simulation(g, alpha, pop0_global, engine_mode, fertility_transition, lookup_version):
+    # Trayectoria sin la corrección post-1950: no depende de include_dem_trans
+    # salvo en el motor generalizado, donde la transición está dentro de n(y)
+    with span("solución exacta"):
+        P_exact, t_sing = analytic_batch(pop0_global, g, alpha, years_sim)
+    result = {"t_sing": t_sing[0], "warning": None, "drift": None, "n_steps": None, "exploded": False}
+
+    if engine_mode == "Analítico (exacto)":
+        P_global = P_exact[0]
+        result["exploded"] = t_sing[0] <= years_sim[-1]
+        if result["exploded"]:
+            result["warning"] = f"⚠️ Singularidad exacta en el año {t_sing[0]:,.1f}. La población diverge en tiempo finito."
+    elif engine_mode == "Adaptativo (RK45)":
+        with span("integración adaptativa (RK45)"):
+            sol_adaptive = simulate_adaptive(pop0_global, g, alpha, (years_sim[0], years_sim[-1]))
+            P_global = sol_adaptive(years_sim)
+        result["exploded"] = sol_adaptive.event is not None
+        if result["exploded"]:
+            result["warning"] = f"⚠️ Evento de {sol_adaptive.event} en el año {sol_adaptive.t_event:,.1f}. La población creció demasiado rápido."
+        result["drift"] = relative_drift(P_global, P_exact)[0]
+        result["n_steps"] = sol_adaptive.n_steps
+    elif engine_mode == "Generalizado (A, P, y)":
+        fertility = partial(kremer_fertility, transition=fertility_transition)
+        with span("integración generalizada (A, P, y)"):
+            _, P_sim, y_sim, stop_sim = simulate_generalized(pop0_global, g, alpha, years_sim, fertility=fertility)
+        P_global = P_sim[0]
+        result["y_final"] = y_sim[0, -1]
+        if stop_sim[0] >= 0:
+            result["warning"] = f"⚠️ Explosión detectada en el año {int(years_sim[stop_sim[0]])}. La población creció demasiado rápido."
+    else:
+        lookup = get_lookup_table()
+        with span("tabla precalculada"):
+            P_global = None if lookup is None else lookup.trajectory(pop0_global, g, alpha, years_sim)
+        result["interpolated"] = P_global is not None
+        if P_global is None:
+            # Integración numérica robusta con detección de explosión
+            with span("bucle de integración (Euler)"):
+                P_sim, stop_sim = simulate_batch(pop0_global, g, alpha, years_sim)
+            P_global = P_sim[0]
+            result["exploded"] = stop_sim[0] >= 0
+            if result["exploded"]:
+                result["warning"] = f"⚠️ Explosión detectada en el año {int(years_sim[stop_sim[0]])}. La población creció demasiado rápido."
+        result["drift"] = relative_drift(P_global, P_exact)[0]
+
+    result["P_base"] = P_global
+    return result
+
+
+def finish_global_run(base_run, include_dem_trans, engine_mode):
+    result = dict(base_run)
+    P_global = base_run["P_base"]
+    # Aplicar transición demográfica suave (solo después de 1950)
+    if include_dem_trans and engine_mode != "Generalizado (A, P, y)" and not base_run["exploded"]:
+        with span("transición demográfica"):
+            P_global = apply_demographic_transition(P_global, years_sim, start=1950)
+    result["P_global"] = P_global
+    return result
+
+
+def growth_points(P_global):
+    # Tasa de crecimiento de cada tramo vs. población al inicio del tramo
+    dt_years = np.diff(years_sim)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gr_sim_full = np.diff(np.log(P_global)) / dt_years
+    P_mid = P_global[:-1]
+    valid = (P_mid > 1e-10) & (dt_years != 0) & np.isfinite(gr_sim_full)
+    return P_mid[valid], gr_sim_full[valid]
+
+
+# Zoom del gráfico 2 y punto de partida de la simulación reciente
+mask_sim_zoom = (years_sim >= -10000) & (years_sim <= 2000)
+index_1900 = int(np.argmin(np.abs(years_sim - 1900)))
+years_recent = np.arange(1900, 2001, 1)
 
-ax1_general.legend()
-ax1_general.grid(True, which="both", ls="--", lw=0.5)
-st.pyplot(fig1_general)
 
-# === Gráfico 2: Zoom en los últimos 12,000 años ===
-fig1_zoom, ax1_zoom = plt.subplots(figsize=(8, 4))
+def recent_trajectories(g, alpha, P_1900):
+    # Simular sin y con transición desde el mismo punto de partida
+    with span("1900–2000 sin transición"):
+        P_recent, _ = simulate_batch(P_1900, g, alpha, years_recent, cap=1000)
+    P_without_trans = P_recent[0]
+    with span("1900–2000 con transición"):
+        P_recent, _ = simulate_batch(P_1900, g, alpha, years_recent, cap=1000, transition_start=1950)
+    P_with_trans = P_recent[0]
+    return P_with_trans, P_without_trans
+
+
+def build_global_graph():
+    # Series derivadas de la simulación global: cada una se recalcula solo si
+    # cambia algo aguas arriba (p. ej. alternar la transición reutiliza la
+    # trayectoria base en lugar de volver a integrar)
+    graph = SeriesGraph()
+    for name in ("g", "alpha", "pop0_global", "include_dem_trans", "engine_mode", "lookup_version"):
+        graph.source(name)
+    graph.node("fertility_transition", ["include_dem_trans", "engine_mode"],
+               lambda include, mode: include and mode == "Generalizado (A, P, y)")
+    graph.node("base_run", ["g", "alpha", "pop0_global", "engine_mode", "fertility_transition", "lookup_version"],
+               run_base_simulation)
+    graph.node("global_run", ["base_run", "include_dem_trans", "engine_mode"], finish_global_run)
+    graph.node("P_global", ["global_run"], lambda run: run["P_global"])
+    graph.node("P_zoom", ["P_global"], lambda P: P[mask_sim_zoom])
+    graph.node("growth_points", ["P_global"], growth_points)
+    graph.node("P_1900", ["P_global"], lambda P: P[index_1900])
+    graph.node("recent", ["g", "alpha", "P_1900"], recent_trajectories)
+    graph.node("recent_growth", ["recent"], lambda recent: tuple(np.diff(np.log(P)) * 100 for P in recent))
+    return graph
+
+
+def session_graph(name, build):
+    # Un grafo por sesión: guarda los valores entre ejecuciones del script
+    if name not in st.session_state:
+        st.session_state[name] = build()
+    return st.session_state[name]
+
+
+series = session_graph("global_graph", build_global_graph).set(
+    g=g, alpha=alpha, pop0_global=pop0_global, include_dem_trans=include_dem_trans, engine_mode=engine_mode,
+    lookup_version=lookup_version()
+)
+global_run = series["global_run"]
+if global_run["warning"]:
+    st.warning(global_run["warning"])
+
+stage("simulación global")
+
+# === Ensamble Monte Carlo (bandas de incertidumbre) ===
+@profiled("ensamble Monte Carlo")
+@st.cache_data(max_entries=ENSEMBLE_CACHE_ENTRIES, show_spinner=False)
+@persistent
+def run_global_ensemble(ens_key):
+    args = ensemble_args(ens_key)
+    executor = ensemble_pool() if args[0] >= ENSEMBLE_POOL_MIN_DRAWS and ENSEMBLE_PROCESSES > 1 else None
+    return run_ensemble(*args, executor=executor)
+
+
+@st.cache_resource
+def ensemble_pool():
+    # Un solo pool por servidor. Sin fork: el servidor de Streamlit es multihilo y
+    # un fork con candados tomados puede bloquear a los trabajadores
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    return ProcessPoolExecutor(max_workers=ENSEMBLE_PROCESSES, mp_context=context)
+
+
+def ensemble_args(ens_key):
+    g, alpha, pop0_global, include_dem_trans, n_draws, g_sd, alpha_sd, pop0_sd, seed = ens_key
+    return (
+        n_draws,
+        ("lognormal", g, g_sd),
+        ("normal", alpha, alpha_sd),
+        ("lognormal", pop0_global, pop0_sd),
+        years_sim,
+        seed,
+        1950 if include_dem_trans else None,
+    )
 
-mask_zoom = (df_hist["Year"] >= -10000) & (df_hist["Year"] <= 2000)
-df_hist_zoom = df_hist[mask_zoom].copy()
 
-mask_sim_zoom = (years_sim >= -10000) & (years_sim <= 2000)
-years_sim_zoom = years_sim[mask_sim_zoom]
-P_global_zoom = P_global[mask_sim_zoom]
+# Trayectorias completas del ensamble descargables desde la app (las más grandes, con kremer.export)
+ENSEMBLE_DOWNLOAD_MAX = 10_000
 
-ax1_zoom.plot(df_hist_zoom["Year"], df_hist_zoom["Pop"], 'o-', label="Datos históricos (Kremer)", color="black", markersize=4)
-ax1_zoom.plot(years_sim_zoom, P_global_zoom, '-', label="Simulación global", color="red")
 
-if st.checkbox("Usar escala logarítmica (zoom)", True):
-    ax1_zoom.set_yscale("log")
-    ax1_zoom.text(0.05, 0.95, 
-                 "Escala log → cada salto = multiplicación",
-                 transform=ax1_zoom.transAxes, fontsize=8, verticalalignment='top', bbox=dict(boxstyle='round,pad=0.3', facecolor='yellow', alpha=0.5))
-else:
-    ax1_zoom.set_yscale("linear")
+def ensemble_file(ens_key, fmt):
+    # Se escribe por bloques en un archivo temporal al pulsar el botón, no en cada ejecución
+    target = tempfile.TemporaryFile()
+    n_draws, g_dist, alpha_dist, P0_dist, years, seed, transition_start = ensemble_args(ens_key)
+    write_ensemble(target, n_draws, g_dist, alpha_dist, P0_dist, years, fmt=fmt, seed=seed,
+                   transition_start=transition_start)
+    target.seek(0)
+    return target
 
-ax1_zoom.set_xlabel("Año (negativo = A.C., positivo = D.C.)")
-ax1_zoom.set_ylabel("Población (billones)")
-ax1_zoom.set_title("Zoom: Evolución de la población (últimos 12,000 años)")
 
-ax1_zoom.set_xticks([-10000, -5000, -1000, 0, 500, 1000, 1500, 1900, 2000])
-ax1_zoom.set_xticklabels(["-10K", "-5K", "-1K", "0", "500", "1K", "1.5K", "1900", "2000"], rotation=45)
+def download_series(label, series, file_stem, key):
+    # Botón de descarga de las series de un gráfico; el archivo se genera al pulsarlo
+    fmt = st.session_state["export_format"]
+    st.download_button(f"💾 {label}", partial(export_scenario, series, fmt), file_name=f"{file_stem}.{fmt}",
+                       mime=MIME_TYPES[fmt], key=key, on_click="ignore")
 
-ax1_zoom.legend()
-ax1_zoom.grid(True, which="both", ls="--", lw=0.5)
-st.pyplot(fig1_zoom)
 
-# Mensaje dinámico según g
-if g < 0.005:
-    st.warning("⚠️ g muy bajo: el crecimiento será muy lento.")
-elif g > 0.015:
-    st.warning("⚠️ g muy alto: la población explotará antes de 1950.")
+def ensemble_layers(ens_key, mask=slice(None)):
+    # Mediana como línea y banda 5–95 % como sombreado temporal de la plantilla
+    if ens_key is None:
+        return {}, ()
+    # Percentiles infinitos (caen entre trayectorias explotadas): se dejan sin dibujar
+    bands = run_global_ensemble(ens_key)["bands"]
+    low, mid, high = np.where(np.isfinite(bands), bands, np.nan)
+    band = (years_sim[mask], low[mask], high[mask], {"color": "red", "alpha": 0.15, "label": "Ensamble 5–95 %"})
+    return {"ens_mid": (years_sim[mask], mid[mask])}, (band,)
+
+
+# === Gráfico 1: Visión general (todo el rango) ===
+@st.cache_resource
+def global_overview_chart():
+    def build(ax1_general):
+        ax1_general.plot(df_hist["Year"], df_hist["Pop"], 'o-', label="Datos históricos (Kremer)", color="black", markersize=3)
+        ax1_general.set_yscale("log")
+        ax1_general.set_xlabel("Año (negativo = A.C., positivo = D.C.)")
+        ax1_general.set_ylabel("Población (billones)")
+        ax1_general.set_title("Evolución global de la población (visión general)")
+
+        ax1_general.set_xticks([-1000000, -500000, -100000, -10000, 0, 1000, 2000])
+        ax1_general.set_xticklabels(["-1M", "-500K", "-100K", "-10K", "0", "1K", "2K"], rotation=45)
+        ax1_general.grid(True, which="both", ls="--", lw=0.5)
+
+    chart = ChartTemplate((8, 4), build)
+    chart.add_line("sim", '-', label="Simulación global", color="red")
+    chart.add_line("ens_mid", ':', color="darkred", label="Mediana del ensamble")
+    return chart
+
+
+@profiled("gráfico: visión general")
+@st.cache_data(max_entries=FIG_CACHE_ENTRIES, show_spinner=False)
+@persistent
+def render_global_overview(P_global, ens_key=None):
+    series, bands = ensemble_layers(ens_key)
+    series["sim"] = (years_sim, P_global)
+    return global_overview_chart().render(series, bands)
+
+
+# === Gráfico 1 en el navegador: un cuadro por cada posición de los sliders ===
+G_VALUES = slider_values(*G_RANGE)
+ALPHA_VALUES = slider_values(*ALPHA_RANGE)
+OVERVIEW_XTICKS = [(-10000, "-10K"), (-5000, "-5K"), (-1000, "-1K"), (0, "0"), (1000, "1K"), (2000, "2K")]
+
+
+@profiled("cuadros del navegador")
+@st.cache_data(max_entries=SIM_CACHE_ENTRIES, show_spinner=False)
+@persistent
+def run_client_frames(pop0_global, include_dem_trans):
+    # No depende de g ni de α: mover los sliders no vuelve a integrar ni a enviar la grilla
+    log_P, stop = scenario_frames(pop0_global, G_VALUES, ALPHA_VALUES, years_sim,
+                                  transition_start=1950 if include_dem_trans else None)
+    return encode_frames(log_P, stop)
+
+
+def client_overview(g, alpha, pop0_global, include_dem_trans):
+    shown = (df_hist["Year"] >= years_sim[0]) & (df_hist["Year"] <= years_sim[-1]) & (df_hist["Pop"] > 0)
+    html = frames_html(run_client_frames(pop0_global, include_dem_trans), G_VALUES, ALPHA_VALUES, years_sim,
+                       g, alpha, zip(df_hist["Year"][shown], df_hist["Pop"][shown]), OVERVIEW_XTICKS)
+    st.iframe(html, height=FRAMES_HEIGHT)
+    st.caption("⚡ Los sliders de este gráfico recorren trayectorias precalculadas (motor de Euler) en el navegador: "
+               "no cambian los parámetros de la app ni las demás secciones.")
+
+
+# === Gráfico 2: Zoom en los últimos 12,000 años ===
+@st.cache_resource
+def global_zoom_chart(log_scale):
+    def build(ax1_zoom):
+        mask_zoom = (df_hist["Year"] >= -10000) & (df_hist["Year"] <= 2000)
+        ax1_zoom.plot(df_hist["Year"][mask_zoom], df_hist["Pop"][mask_zoom], 'o-', label="Datos históricos (Kremer)", color="black", markersize=4)
+
+        if log_scale:
+            ax1_zoom.set_yscale("log")
+            ax1_zoom.text(0.05, 0.95, 
+                         "Escala log → cada salto = multiplicación",
+                         transform=ax1_zoom.transAxes, fontsize=8, verticalalignment='top', bbox=dict(boxstyle='round,pad=0.3', facecolor='yellow', alpha=0.5))
+        else:
+            ax1_zoom.set_yscale("linear")
+
+        ax1_zoom.set_xlabel("Año (negativo = A.C., positivo = D.C.)")
+        ax1_zoom.set_ylabel("Población (billones)")
+        ax1_zoom.set_title("Zoom: Evolución de la población (últimos 12,000 años)")
+
+        ax1_zoom.set_xticks([-10000, -5000, -1000, 0, 500, 1000, 1500, 1900, 2000])
+        ax1_zoom.set_xticklabels(["-10K", "-5K", "-1K", "0", "500", "1K", "1.5K", "1900", "2000"], rotation=45)
+        ax1_zoom.grid(True, which="both", ls="--", lw=0.5)
+
+    chart = ChartTemplate((8, 4), build)
+    chart.add_line("sim", '-', label="Simulación global", color="red")
+    chart.add_line("ens_mid", ':', color="darkred", label="Mediana del ensamble")
+    return chart
+
+
+@profiled("gráfico: zoom")
+@st.cache_data(max_entries=FIG_CACHE_ENTRIES, show_spinner=False)
+@persistent
+def render_global_zoom(P_zoom, log_scale, ens_key=None):
+    series, bands = ensemble_layers(ens_key, mask_sim_zoom)
+    series["sim"] = (years_sim[mask_sim_zoom], P_zoom)
+    return global_zoom_chart(log_scale).render(series, bands)
 
-with st.expander("📊 Dinámica del ciclo de crecimiento poblacional"):
-    st.image("assets/ciclo.jpg", caption="Figura 2. ciclo del crecimiento poblacional y tecnologia", width=600)
 
     
 # === Gráfico 3: Tasa de crecimiento vs población (CORREGIDO) ===
-log_P = np.log(P_global)
-dlogP = np.diff(log_P)
-dt_years = np.diff(years_sim)
-gr_sim_full = dlogP / dt_years
-P_mid = P_global[:-1]
-
-valid = (P_mid > 1e-10) & (dt_years != 0) & np.isfinite(gr_sim_full)
-P_plot = P_mid[valid]
-gr_plot = gr_sim_full[valid]
-
-fig2, ax2 = plt.subplots(figsize=(6, 4))
-hist_gr = np.diff(np.log(df_hist["Pop"])) / np.diff(df_hist["Year"])
-hist_valid = (df_hist["Pop"].iloc[:-1] > 0) & np.isfinite(hist_gr)
-ax2.scatter(
-    df_hist["Pop"].iloc[:-1][hist_valid],
-    hist_gr[hist_valid],
-    label="Datos históricos",
-    color="black",
-    s=15
-)
-ax2.plot(P_plot, gr_plot, label="Simulación", color="red")
-ax2.set_xlabel("Población (billones)")
-ax2.set_ylabel("Tasa de crecimiento anual")
-ax2.set_title("Tasa de crecimiento vs. nivel de población")
-ax2.legend()
-ax2.grid(True, ls="--", lw=0.5)
-st.pyplot(fig2)
+@st.cache_resource
+def growth_vs_population_chart():
+    def build(ax2):
+        hist_gr = df_hist["Growth_rate"][:-1]
+        hist_valid = (df_hist["Pop"][:-1] > 0) & np.isfinite(hist_gr)
+        ax2.scatter(
+            df_hist["Pop"][:-1][hist_valid],
+            hist_gr[hist_valid],
+            label="Datos históricos",
+            color="black",
+            s=15
+        )
+        ax2.set_xlabel("Población (billones)")
+        ax2.set_ylabel("Tasa de crecimiento anual")
+        ax2.set_title("Tasa de crecimiento vs. nivel de población")
+        ax2.grid(True, ls="--", lw=0.5)
+
+    chart = ChartTemplate((6, 4), build)
+    chart.add_line("sim", label="Simulación", color="red")
+    return chart
+
+
+@profiled("gráfico: crecimiento vs. población")
+@st.cache_data(max_entries=FIG_CACHE_ENTRIES, show_spinner=False)
+@persistent
+def render_growth_vs_population(P_plot, gr_plot):
+    return growth_vs_population_chart().render({"sim": (P_plot, gr_plot)})
+
+
+# Cada sección se ejecuta como fragmento: un widget dentro de ella solo vuelve a
+# correr su propia sección, no el script completo.
+@st.fragment
+def global_section(series):
+    g, alpha, pop0_global = series["g"], series["alpha"], series["pop0_global"]
+    include_dem_trans, engine_mode = series["include_dem_trans"], series["engine_mode"]
+    global_run = series["global_run"]
+
+    with st.expander("🎲 Ensamble de incertidumbre (Monte Carlo)"):
+        st.markdown("""
+        Sortea `g`, `α` y la población inicial alrededor de los valores elegidos y sombrea las bandas
+        del **5 %, 50 % y 95 %** de las trayectorias en los gráficos de evolución global.
+        `g` y la población inicial siguen distribuciones log-normales (σ relativo); `α`, una normal.
+        """)
+        ensemble_on = st.checkbox("Mostrar bandas de incertidumbre", False, key="ensemble_on")
+        e1, e2 = st.columns(2)
+        with e1:
+            n_draws = st.select_slider("Número de trayectorias", options=[1_000, 10_000, 100_000], value=10_000)
+            g_sd = st.number_input("σ relativo de g", min_value=0.0, max_value=1.0, value=0.1, step=0.01)
+            alpha_sd = st.number_input("Desvío de α", min_value=0.0, max_value=0.1, value=0.02, step=0.005, format="%.3f")
+        with e2:
+            pop0_sd = st.number_input("σ relativo de la población inicial", min_value=0.0, max_value=1.0, value=0.1, step=0.01)
+            ensemble_seed = st.number_input("Semilla", min_value=0, value=0, step=1)
+
+    ens_key = None
+    if ensemble_on:
+        ens_key = (g, alpha, pop0_global, include_dem_trans, n_draws, g_sd, alpha_sd, pop0_sd, int(ensemble_seed))
+        with st.spinner("Integrando el ensamble..."):
+            ensemble = run_global_ensemble(ens_key)
+        st.caption(f"🎲 {n_draws:,} trayectorias; {ensemble['exploded_fraction']:.1%} explotaron antes de 2000.")
+        cut = ~np.isfinite(ensemble["bands"][-1])
+        if cut.any():
+            st.caption(f"💥 Desde el año {int(years_sim[cut.argmax()])} más del {100 - ensemble['percentiles'][-1]} % "
+                       f"de las trayectorias ya explotó: el percentil {ensemble['percentiles'][-1]} es infinito "
+                       "y la banda no se dibuja desde ahí.")
+
+    with st.expander("ℹ️ Evidencia I"):
+        # imgen de ayuda del crecimiento poblacional
+        st.image("assets/Marcha.jpg", caption="Figura 1. Tasa de crecimiento vs población en años", width=600)
+
+    if st.session_state["client_frames"]:
+        client_overview(g, alpha, pop0_global, include_dem_trans)
+    else:
+        st.image(render_global_overview(series["P_global"], ens_key))
+    global_data = {"P_global": (years_sim, series["P_global"])}
+    if ens_key is not None:
+        for q, band in zip(ensemble["percentiles"], ensemble["bands"]):
+            global_data[f"ensemble_p{q:02d}"] = (years_sim, band)
+    d1, d2 = st.columns(2)
+    with d1:
+        download_series("Datos de la simulación global", global_data, "kremer_global", "download_global")
+    if ens_key is not None and n_draws <= ENSEMBLE_DOWNLOAD_MAX:
+        fmt = st.session_state["export_format"]
+        d2.download_button(f"💾 Trayectorias del ensamble ({n_draws:,})", partial(ensemble_file, ens_key, fmt),
+                           file_name=f"kremer_ensemble.{fmt}", mime=MIME_TYPES[fmt], key="download_ensemble",
+                           on_click="ignore")
+    elif ens_key is not None:
+        d2.caption(f"Para más de {ENSEMBLE_DOWNLOAD_MAX:,} trayectorias use `kremer.export.write_ensemble`.")
+
+    if engine_mode == "Adaptativo (RK45)":
+        st.caption(f"📐 El integrador adaptativo usó {global_run['n_steps']} pasos (Euler usa {len(years_sim) - 1}). "
+                   f"Desviación máxima respecto a la solución exacta: {global_run['drift']:.2e}.")
+    elif engine_mode == "Generalizado (A, P, y)":
+        st.caption(f"🧬 Ingreso per cápita relativo en {years_sim[-1]}: y = {global_run['y_final']:.3g} "
+                   f"(subsistencia = 1, umbral de transición y* = 1.5).")
+    elif engine_mode == "Numérico (Euler)":
+        st.caption(f"📐 Desviación máxima de Euler (dt = 10) respecto a la solución exacta: {global_run['drift']:.2%}. "
+                   f"Singularidad exacta en el año {global_run['t_sing']:,.0f}.")
+        if global_run.get("interpolated"):
+            st.caption(f"🗂️ Trayectoria interpolada de la tabla precalculada: difiere de Euler integrado en menos "
+                       f"de {LOOKUP_MAX_ERROR:.0e} (relativo).")
+
+    zoom_log_scale = st.checkbox("Usar escala logarítmica (zoom)", True)
+    st.image(render_global_zoom(series["P_zoom"], zoom_log_scale, ens_key))
+
+    # Mensaje dinámico según g
+    if g < 0.005:
+        st.warning("⚠️ g muy bajo: el crecimiento será muy lento.")
+    elif g > 0.015:
+        st.warning("⚠️ g muy alto: la población explotará antes de 1950.")
+
+    with st.expander("📊 Dinámica del ciclo de crecimiento poblacional"):
+        st.image("assets/ciclo.jpg", caption="Figura 2. ciclo del crecimiento poblacional y tecnologia", width=600)
+
+    st.image(render_growth_vs_population(*series["growth_points"]))
+
+
+global_section(series)
+stage("sección global")
+
+
+# === Sensibilidad a g, α y la población inicial ===
+SOBOL_YEARS_STEP = 10  # índices cada 100 años (10 pasos de la grilla)
+SENSITIVITY_LABELS = {"g": "g", "alpha": "α", "P0": "Población inicial"}
+SENSITIVITY_COLORS = {"g": "tab:blue", "alpha": "tab:orange", "P0": "tab:green"}
+
+
+@profiled("sensibilidades hacia adelante")
+@st.cache_data(max_entries=SIM_CACHE_ENTRIES, show_spinner=False)
+@persistent
+def run_forward_sensitivities(g, alpha, pop0_global, include_dem_trans):
+    P, S, stop = forward_sensitivities(pop0_global, g, alpha, years_sim,
+                                       transition_start=1950 if include_dem_trans else None)
+    return elasticities(P, S, pop0_global, g, alpha)[:, 0], int(stop[0])
+
+
+@profiled("índices de Sobol")
+@st.cache_data(max_entries=ENSEMBLE_CACHE_ENTRIES, show_spinner=False)
+@persistent
+def run_sobol(g, alpha, pop0_global, include_dem_trans, spread, n_base):
+    bounds = [
+        (g * (1 - spread), g * (1 + spread)),
+        (max(alpha * (1 - spread), 0.01), min(alpha * (1 + spread), 0.99)),
+        (pop0_global * (1 - spread), pop0_global * (1 + spread)),
+    ]
+    return sobol_indices(bounds, years_sim, n=n_base, output_index=np.arange(0, len(years_sim), SOBOL_YEARS_STEP),
+                         transition_start=1950 if include_dem_trans else None)
+
+
+@st.cache_resource
+def elasticity_chart():
+    def build(ax):
+        ax.set_yscale("log")
+        ax.set_xlabel("Año")
+        ax.set_ylabel("|Elasticidad| de P(t)")
+        ax.set_title("Cambio % de la población por cada 1 % de cada parámetro")
+        ax.grid(True, which="both", ls="--", lw=0.5)
+
+    chart = ChartTemplate((8, 4), build)
+    for name in PARAMETERS:
+        chart.add_line(name, '-', color=SENSITIVITY_COLORS[name], label=SENSITIVITY_LABELS[name])
+    return chart
+
+
+@profiled("gráfico: elasticidades")
+@st.cache_data(max_entries=FIG_CACHE_ENTRIES, show_spinner=False)
+@persistent
+def render_elasticities(elast):
+    return elasticity_chart().render({name: (years_sim, np.abs(e)) for name, e in zip(PARAMETERS, elast)})
+
+
+@st.cache_resource
+def sobol_chart():
+    def build(ax):
+        ax.set_ylim(-0.05, 1.05)
+        ax.set_xlabel("Año")
+        ax.set_ylabel("Fracción de la varianza de log P(t)")
+        ax.set_title("Índices de Sobol: primer orden (—) y totales (- -)")
+        ax.grid(True, ls="--", lw=0.5)
+
+    chart = ChartTemplate((8, 4), build)
+    for name in PARAMETERS:
+        chart.add_line(f"first_{name}", '-', color=SENSITIVITY_COLORS[name], label=SENSITIVITY_LABELS[name])
+        chart.add_line(f"total_{name}", '--', color=SENSITIVITY_COLORS[name])
+    return chart
+
+
+@profiled("gráfico: índices de Sobol")
+@st.cache_data(max_entries=FIG_CACHE_ENTRIES, show_spinner=False)
+@persistent
+def render_sobol(sobol_years, first, total):
+    series = {}
+    for name, s_first, s_total in zip(PARAMETERS, first, total):
+        series[f"first_{name}"] = (sobol_years, s_first)
+        series[f"total_{name}"] = (sobol_years, s_total)
+    return sobol_chart().render(series)
+
+
+@st.fragment
+def sensitivity_section(g, alpha, pop0_global, include_dem_trans):
+    with st.expander("📐 Sensibilidad a g, α y la población inicial"):
+        st.markdown("""
+        **Sensibilidades locales:** la derivada de la trayectoria respecto de cada parámetro se integra junto
+        con ella (motor de Euler). La elasticidad indica cuántos puntos porcentuales cambia la población por
+        cada 1 % de cambio en el parámetro: crece sin límite al acercarse la singularidad.
+        """)
+        # El expander se dibuja aunque esté cerrado: sin este interruptor se
+        # integraría en cada cambio de parámetros
+        elasticities_on = st.checkbox("Calcular elasticidades", False, key="elasticities_on")
+        if elasticities_on:
+            elast, stop = run_forward_sensitivities(g, alpha, pop0_global, include_dem_trans)
+            st.image(render_elasticities(elast))
+            if stop >= 0:
+                st.caption(f"La trayectoria explota en el año {int(years_sim[stop])}; desde ahí la derivada no está definida.")
+            else:
+                st.caption("Elasticidades en 1990: " + ", ".join(
+                    f"{SENSITIVITY_LABELS[name]} {e[-1]:.2f}" for name, e in zip(PARAMETERS, elast)) + ".")
+
+        st.markdown("""
+        **Índices de Sobol:** qué fracción de la varianza de log P(t) se debe a cada parámetro cuando los tres
+        varían a la vez en un rango alrededor de los valores elegidos (primer orden: efecto propio;
+        total: incluye interacciones). Se estiman con muestras cuasi-aleatorias integradas en lote.
+        """)
+        sobol_on = st.checkbox("Estimar índices de Sobol", False, key="sobol_on")
+        c1, c2 = st.columns(2)
+        spread = c1.select_slider("Rango de cada parámetro (±)", options=[0.05, 0.1, 0.25],
+                                  value=0.1, format_func=lambda v: f"{v:.0%}", key="sobol_spread")
+        n_base = c2.select_slider("Muestras base (N)", options=[1024, 4096, 16384], value=4096, key="sobol_n")
+        if sobol_on:
+            with st.spinner(f"Integrando {n_base * (len(PARAMETERS) + 2):,} trayectorias..."):
+                sobol = run_sobol(g, alpha, pop0_global, include_dem_trans, spread, n_base)
+            st.image(render_sobol(sobol["years"], sobol["first"], sobol["total"]))
+            st.caption(f"{sobol['evaluations']:,} evaluaciones del modelo (N · (d + 2), d = {len(PARAMETERS)}). "
+                       "Las trayectorias que explotan se acotan en el tope de población.")
+
+
+sensitivity_section(g, alpha, pop0_global, include_dem_trans)
+stage("sensibilidad")
+
 
 with st.expander("📉 La desaceleración del crecimiento poblacional"):
     st.markdown("""
@@ -287,204 +819,385 @@ with st.expander("📉 La desaceleración del crecimiento poblacional"):
 
 
 # === Gráfico 3: Desaceleración reciente (1900–2000) ===
-st.subheader("📉 Desaceleración del crecimiento poblacional (1900–2000)")
+@st.cache_resource
+def recent_slowdown_chart():
+    def build(ax_recent):
+        mask_hist = (df_hist["Year"] >= 1900) & (df_hist["Year"] <= 2000)
+        gr_hist = df_hist["Growth_rate"][mask_hist][:-1] * 100
+        ax_recent.plot(
+            df_hist["Year"][mask_hist][:-1], gr_hist,
+            'o-', color="black", label="Datos históricos", markersize=4
+        )
+        ax_recent.set_xlabel("Año")
+        ax_recent.set_ylabel("Tasa de crecimiento anual (%)")
+        ax_recent.set_title("Desaceleración del crecimiento poblacional (1900–2000)")
+        ax_recent.grid(True, ls="--", lw=0.5)
+
+    chart = ChartTemplate((8, 4), build)
+    chart.add_line("with", '-', color="green", label="Con transición demográfica")
+    chart.add_line("without", '--', color="red", label="Sin transición demográfica")
+    return chart
+
+
+@profiled("gráfico: desaceleración 1900–2000")
+@st.cache_data(max_entries=FIG_CACHE_ENTRIES, show_spinner=False)
+@persistent
+def render_recent_slowdown(gr_with, gr_without):
+    return recent_slowdown_chart().render({
+        "with": (years_recent[:-1], gr_with),
+        "without": (years_recent[:-1], gr_without),
+    })
+
+
+@st.fragment
+def transition_section(series):
+    st.subheader("📉 Desaceleración del crecimiento poblacional (1900–2000)")
+    st.image(render_recent_slowdown(*series["recent_growth"]))
+    P_with_trans, P_without_trans = series["recent"]
+    download_series("Datos 1900–2000", {"P_with_trans": (years_recent, P_with_trans),
+                                        "P_without_trans": (years_recent, P_without_trans)},
+                    "kremer_1900_2000", "download_recent")
+
+    st.caption("💡 La transición demográfica explica por qué el crecimiento poblacional se desacelera tras ~1960, "
+              "a pesar de que la tecnología sigue avanzando. Sin ella, el modelo predice aceleración continua.")
+
+    with st.expander("ℹ️ Detalles de la simulación de desaceleración"):
+        st.image("assets/Quiebre.jpg", caption="Figura 3. Simulación de la desaceleración del crecimiento poblacional (1900–2000)", width=600)
+
+
+transition_section(series)
+stage("transición demográfica")
 
-years_recent = np.arange(1900, 2001, 1)
-P_with_trans = np.full_like(years_recent, P_global[np.argmin(np.abs(years_sim - 1900))], dtype=float)
-P_without_trans = np.full_like(years_recent, P_global[np.argmin(np.abs(years_sim - 1900))], dtype=float)
-
-P_1900 = P_global[np.argmin(np.abs(years_sim - 1900))]
-P_with_trans[0] = P_1900
-P_without_trans[0] = P_1900
-
-# Simular sin transición
-for i in range(1, len(years_recent)):
-    dPdt = (g / (1 - alpha)) * P_without_trans[i-1]**2
-    P_without_trans[i] = P_without_trans[i-1] + dPdt * 1
-    if P_without_trans[i] > 1000:
-        P_without_trans[i] = 1000
-        break
-
-# Simular con transición
-for i in range(1, len(years_recent)):
-    dPdt = (g / (1 - alpha)) * P_with_trans[i-1]**2
-    P_with_trans[i] = P_with_trans[i-1] + dPdt * 1
-    if P_with_trans[i] > 1000:
-        P_with_trans[i] = 1000
-        break
-    if years_recent[i] >= 1950:
-        years_since_1950 = years_recent[i] - 1950
-        reduction_factor = max(0.2, 1 - 0.015 * years_since_1950)
-        current_growth = np.log(P_with_trans[i] / P_with_trans[i-1])
-        adjusted_growth = current_growth * reduction_factor
-        P_with_trans[i] = P_with_trans[i-1] * np.exp(adjusted_growth)
-
-# Calcular tasas de crecimiento (%/año)
-gr_with = np.diff(np.log(P_with_trans)) * 100
-gr_without = np.diff(np.log(P_without_trans)) * 100
-
-mask_hist = (df_hist["Year"] >= 1900) & (df_hist["Year"] <= 2000)
-df_hist_recent = df_hist[mask_hist].copy()
-gr_hist = np.diff(np.log(df_hist_recent["Pop"])) / np.diff(df_hist_recent["Year"]) * 100
-
-fig_recent, ax_recent = plt.subplots(figsize=(8, 4))
-ax_recent.plot(
-    df_hist_recent["Year"].iloc[:-1], gr_hist,
-    'o-', color="black", label="Datos históricos", markersize=4
-)
-ax_recent.plot(
-    years_recent[:-1], gr_with,
-    '-', color="green", label="Con transición demográfica"
-)
-ax_recent.plot(
-    years_recent[:-1], gr_without,
-    '--', color="red", label="Sin transición demográfica"
-)
-
-ax_recent.set_xlabel("Año")
-ax_recent.set_ylabel("Tasa de crecimiento anual (%)")
-ax_recent.set_title("Desaceleración del crecimiento poblacional (1900–2000)")
-ax_recent.legend()
-ax_recent.grid(True, ls="--", lw=0.5)
-st.pyplot(fig_recent)
 
-st.caption("💡 La transición demográfica explica por qué el crecimiento poblacional se desacelera tras ~1960, "
-          "a pesar de que la tecnología sigue avanzando. Sin ella, el modelo predice aceleración continua.")
-
-with st.expander("ℹ️ Detalles de la simulación de desaceleración"):
-    st.image("assets/Quiebre.jpg", caption="Figura 3. Simulación de la desaceleración del crecimiento poblacional (1900–2000)", width=600)
 # === Gráfico A: Figura II — Tasa de crecimiento vs. ingreso per cápita ===
-st.subheader("📈 Figura II: Tasa de crecimiento poblacional vs. ingreso per cápita")
-
-# Crear curva teórica n(y): forma de campana invertida
-y_vals = np.linspace(0.5, 2.5, 200)
-y_star = 1.5  # Punto máximo (ingreso umbral)
-n_vals = np.where(
-    y_vals <= y_star,
-    0.02 * (y_vals / y_star),          # Rama creciente
-    0.02 * (2 - y_vals / y_star)       # Rama decreciente
-)
-n_vals = np.maximum(n_vals, 0)
-
-fig_ii, ax_ii = plt.subplots(figsize=(8, 4))
-ax_ii.plot(y_vals, n_vals, 'k-', linewidth=2, label=r"Curva teórica $n(y)$")
-ax_ii.axvline(x=y_star, color='red', linestyle='--', label=r"$y^*$ (umbral de transición)")
-ax_ii.set_xlabel("Ingreso per cápita (relativo)")
-ax_ii.set_ylabel("Tasa de crecimiento poblacional (% anual)")
-ax_ii.set_title("Figura II: Dinámica de la transición demográfica")
-ax_ii.legend()
-ax_ii.grid(True, ls="--", lw=0.5)
-st.pyplot(fig_ii)
-
-st.markdown("""
-**Interpretación económica:**  
-- **Rama izquierda**: En sociedades pobres, más ingreso permite criar más hijos → crecimiento ↑.  
-- **Rama derecha**: En sociedades ricas, más ingreso reduce la fertilidad → crecimiento ↓.  
-- **Pico en \( y^* \)**: Representa el punto de inflexión donde comienza la transición demográfica.  
-- Esta dinámica explica por qué el crecimiento poblacional se desacelera después de 1950, **no por escasez, sino por prosperidad**.
-""")
-
-
-
-# === Sección comparativa: Regiones aisladas ===
-st.subheader("🌍 Comparación entre regiones aisladas (sin contacto tecnológico)")
-with st.expander("ℹ️ ¿Qué muestra esta simulación?"):
+@profiled("gráfico: figura II")
+@st.cache_resource
+def render_figure_ii():
+    # Curva n(y) que usa el motor generalizado: forma de campana invertida
+    y_vals = np.linspace(0.5, 2.5, 200)
+    y_star = 1.5  # Punto máximo (ingreso umbral)
+    n_vals = kremer_fertility(y_vals, y_bar=1.0, y_star=y_star)
+
+    fig_ii = new_figure((8, 4))
+    ax_ii = fig_ii.add_subplot()
+    ax_ii.plot(y_vals, n_vals, 'k-', linewidth=2, label=r"Curva teórica $n(y)$")
+    ax_ii.axvline(x=y_star, color='red', linestyle='--', label=r"$y^*$ (umbral de transición)")
+    ax_ii.axvline(x=1.0, color='gray', linestyle=':', label=r"$\bar{y}$ (subsistencia)")
+    ax_ii.set_xlabel("Ingreso per cápita (relativo)")
+    ax_ii.set_ylabel("Tasa de crecimiento poblacional (% anual)")
+    ax_ii.set_title("Figura II: Dinámica de la transición demográfica")
+    ax_ii.legend()
+    ax_ii.grid(True, ls="--", lw=0.5)
+    return figure_png(fig_ii)
+
+
+@st.fragment
+def figure_ii_section():
+    st.subheader("📈 Figura II: Tasa de crecimiento poblacional vs. ingreso per cápita")
+    st.image(render_figure_ii())
+
     st.markdown("""
-    **Contexto histórico (Kremer, 1993, Sección IV.B):**  
-    Hasta 1500, regiones como Tasmania, las Américas y el Viejo Mundo estuvieron aisladas.  
-    El modelo predice que **la región con mayor población inicial generará más innovación** (más inventores), lo que lleva a:
-    - Mayor crecimiento poblacional.
-    - Mayor densidad tecnológica (aquí proxieda por la población misma).
-
-    **En esta simulación:**  
-    - Ambas regiones usan los mismos parámetros (`g`, `α`).  
-    - Solo difieren en su **población inicial**.  
-    - No hay intercambio de ideas (tecnología no se difunde).  
-    - Observamos cómo pequeñas diferencias iniciales se amplifican con el tiempo.
-
-    **Ejemplo real:**  
-    - Viejo Mundo (1500): ~407 millones → civilizaciones avanzadas.  
-    - Tasmania (1500): ~1,200–5,000 personas → perdió tecnologías como hacer fuego.
+    **Interpretación económica:**  
+    - **Rama izquierda**: En sociedades pobres, más ingreso permite criar más hijos → crecimiento ↑.  
+    - **Rama derecha**: En sociedades ricas, más ingreso reduce la fertilidad → crecimiento ↓.  
+    - **Pico en \( y^* \)**: Representa el punto de inflexión donde comienza la transición demográfica.  
+    - Esta dinámica explica por qué el crecimiento poblacional se desacelera después de 1950, **no por escasez, sino por prosperidad**.
     """)
-with st.expander("ℹ️ Evidencia II"):
-    st.image("assets/regiones.png", caption="Figura 4. Hace 12.000 años, el derretimiento de los hielos creó cuatro laboratorios aislados. Sin contacto hasta 1500 d.C.", width=680)
-
-st.write("Simulamos dos sociedades independientes desde **10,000 A.C. hasta 1500 D.C.**")
-
-col3, col4 = st.columns(2)
-with col3:
-    P0_old_millions = st.number_input(
-        "Población inicial: Viejo Mundo (millones)",
-        min_value=1.0,
-        max_value=1000.0,
-        value=st.session_state["P0_old_input"],
-        step=10.0,
-        key="P0_old_input"
+
+
+figure_ii_section()
+stage("figura II")
+
+
+
+years_iso = np.arange(-10000, 1500, 10)
+
+
+@profiled("regiones aisladas")
+@st.cache_data(max_entries=SIM_CACHE_ENTRIES, show_spinner=False)
+@persistent
+def run_isolated_regions(g, alpha, P0_old_millions, P0_tas_millions):
+    # Convertir a billones
+    P0_old = P0_old_millions / 1000
+    P0_tas = P0_tas_millions / 1000
+
+    # Simulación aislada (hasta 1500): ambas regiones como una matriz región × tiempo
+    with span("bucle de integración (regiones)"):
+        P_iso, _ = simulate_regions([P0_old, P0_tas], g, alpha, years_iso, cap=1000)
+    P_old, P_tas = P_iso
+    return P_old, P_tas
+
+
+@st.cache_resource
+def isolated_regions_chart():
+    def build(ax3):
+        ax3.set_yscale("log")
+        ax3.set_xlabel("Año (negativo = A.C., positivo = D.C.)")
+        ax3.set_ylabel("Población (billones, escala log)")
+        ax3.set_title("Evolución de poblaciones aisladas (10,000 A.C. – 1500 D.C.)")
+        ax3.set_xticks([-10000, -5000, -1000, 0, 500, 1000, 1500])
+        ax3.set_xticklabels(["-10K", "-5K", "-1K", "0", "500", "1K", "1500"], rotation=45)
+        ax3.grid(True, which="both", ls="--", lw=0.5)
+
+    chart = ChartTemplate((8, 4), build)
+    chart.add_line("old", color="blue")
+    chart.add_line("tas", color="orange")
+    return chart
+
+
+@profiled("gráfico: regiones aisladas")
+@st.cache_data(max_entries=FIG_CACHE_ENTRIES, show_spinner=False)
+@persistent
+def render_isolated_regions(P_old, P_tas, P0_old_millions, P0_tas_millions):
+
+    # Gráfico 5: Comparación de trayectorias
+    return isolated_regions_chart().render(
+        {"old": (years_iso, P_old), "tas": (years_iso, P_tas)},
+        labels={"old": f"Viejo Mundo ({P0_old_millions:.0f}M)", "tas": f"Tasmania ({P0_tas_millions:.3f}M)"}
     )
-with col4:
-    P0_tas_millions = st.number_input(
-        "Población inicial: Tasmania (millones)",
-        min_value=0.001,
-        max_value=10.0,
-        value=st.session_state["P0_tas_input"],
-        step=0.001,
-        format="%.3f",
-        key="P0_tas_input"
+
+
+@st.cache_resource
+def technology_gap_chart():
+    def build(ax4):
+        ax4.set_yscale("log")
+        ax4.set_xlabel("Año")
+        ax4.set_ylabel("Relación (Viejo Mundo / Tasmania)")
+        ax4.set_title("Brecha tecnológica relativa (proxy: relación de poblaciones)")
+        ax4.set_xticks([-10000, -5000, -1000, 0, 500, 1000, 1500])
+        ax4.set_xticklabels(["-10K", "-5K", "-1K", "0", "500", "1K", "1500"], rotation=45)
+        ax4.grid(True, which="both", ls="--", lw=0.5)
+
+    chart = ChartTemplate((6, 4), build)
+    chart.add_line("ratio", color="purple")
+    return chart
+
+
+@profiled("gráfico: brecha tecnológica")
+@st.cache_data(max_entries=FIG_CACHE_ENTRIES, show_spinner=False)
+@persistent
+def render_technology_gap(ratio):
+    # Gráfico 4: Brecha tecnológica relativa
+    return technology_gap_chart().render({"ratio": (years_iso, ratio)}, legend=False)
+
+
+# === Modo estocástico: innovaciones de Poisson y pérdida de tecnología ===
+STOCHASTIC_RECORD_EVERY = 5  # percentiles cada 50 años
+SWEEP_P0_MILLIONS = np.geomspace(0.0001, 1000, 15)  # de 100 personas a mil millones
+SWEEP_REPLICAS = 1000
+
+
+@profiled("regiones estocásticas")
+@st.cache_data(max_entries=SIM_CACHE_ENTRIES, show_spinner=False)
+@persistent
+def run_stochastic_regions(g, alpha, P0_old_millions, P0_tas_millions, replicas, loss_rate, loss_scale_thousands):
+    return simulate_stochastic([P0_old_millions / 1000, P0_tas_millions / 1000], g, alpha, years_iso,
+                               replicas=replicas, loss_rate=loss_rate, loss_scale=loss_scale_thousands * 1e-6,
+                               record_every=STOCHASTIC_RECORD_EVERY)
+
+
+@profiled("barrido estocástico")
+@st.cache_data(max_entries=SIM_CACHE_ENTRIES, show_spinner=False)
+@persistent
+def run_stochastic_sweep(g, alpha, loss_rate, loss_scale_thousands):
+    # Solo interesan las probabilidades finales: un registro al inicio y otro al final
+    result = simulate_stochastic(SWEEP_P0_MILLIONS / 1000, g, alpha, years_iso, replicas=SWEEP_REPLICAS,
+                                 loss_rate=loss_rate, loss_scale=loss_scale_thousands * 1e-6,
+                                 record_every=len(years_iso))
+    return result["extinct"][:, -1], result["tech_loss"]
+
+
+@st.cache_resource
+def stochastic_regions_chart():
+    def build(ax):
+        ax.set_yscale("log")
+        ax.set_xlabel("Año (negativo = A.C., positivo = D.C.)")
+        ax.set_ylabel("Población (billones, escala log)")
+        ax.set_title("Réplicas estocásticas: mediana y banda 5–95 %")
+        ax.set_xticks([-10000, -5000, -1000, 0, 500, 1000, 1500])
+        ax.set_xticklabels(["-10K", "-5K", "-1K", "0", "500", "1K", "1500"], rotation=45)
+        ax.grid(True, which="both", ls="--", lw=0.5)
+
+    chart = ChartTemplate((8, 4), build)
+    chart.add_line("old", color="blue", label="Viejo Mundo (mediana)")
+    chart.add_line("tas", color="orange", label="Tasmania (mediana)")
+    return chart
+
+
+@profiled("gráfico: regiones estocásticas")
+@st.cache_data(max_entries=FIG_CACHE_ENTRIES, show_spinner=False)
+@persistent
+def render_stochastic_regions(stoch_years, bands):
+    low, mid, high = bands
+    return stochastic_regions_chart().render(
+        {"old": (stoch_years, mid[0]), "tas": (stoch_years, mid[1])},
+        bands=[(stoch_years, low[0], high[0], {"color": "blue", "alpha": 0.15}),
+               (stoch_years, low[1], high[1], {"color": "orange", "alpha": 0.2})],
     )
 
-# Convertir a billones
-P0_old = P0_old_millions / 1000
-P0_tas = P0_tas_millions / 1000
 
-# Simulación aislada (hasta 1500)
-years_iso = np.arange(-10000, 1500, 10)
-P_old = np.full_like(years_iso, P0_old, dtype=float)
-P_tas = np.full_like(years_iso, P0_tas, dtype=float)
-
-def simulate_population(P0, years, g, alpha, dt=10):
-    P = np.full_like(years, P0, dtype=float)
-    for i in range(1, len(years)):
-        dPdt = (g / (1 - alpha)) * P[i-1]**2
-        P[i] = P[i-1] + dPdt * dt
-        if np.isinf(P[i]) or np.isnan(P[i]) or P[i] > 1000:
-            P[i] = 1000
-            break
-        if P[i] < 1e-12:
-            P[i] = 1e-12
-    return P
-
-P_old = simulate_population(P0_old, years_iso, g, alpha)
-P_tas = simulate_population(P0_tas, years_iso, g, alpha)
-
-# Gráfico 5: Comparación de trayectorias
-fig3, ax3 = plt.subplots(figsize=(8, 4))
-ax3.plot(years_iso, P_old, label=f"Viejo Mundo ({P0_old_millions:.0f}M)", color="blue")
-ax3.plot(years_iso, P_tas, label=f"Tasmania ({P0_tas_millions:.3f}M)", color="orange")
-ax3.set_yscale("log")
-ax3.set_xlabel("Año (negativo = A.C., positivo = D.C.)")
-ax3.set_ylabel("Población (billones, escala log)")
-ax3.set_title("Evolución de poblaciones aisladas (10,000 A.C. – 1500 D.C.)")
-ax3.set_xticks([-10000, -5000, -1000, 0, 500, 1000, 1500])
-ax3.set_xticklabels(["-10K", "-5K", "-1K", "0", "500", "1K", "1500"], rotation=45)
-ax3.legend()
-ax3.grid(True, which="both", ls="--", lw=0.5)
-st.pyplot(fig3)
-
-# Gráfico 4: Brecha tecnológica relativa
-ratio = np.divide(P_old, P_tas, out=np.ones_like(P_old), where=P_tas != 0)
-fig4, ax4 = plt.subplots(figsize=(6, 4))
-ax4.plot(years_iso, ratio, color="purple")
-ax4.set_yscale("log")
-ax4.set_xlabel("Año")
-ax4.set_ylabel("Relación (Viejo Mundo / Tasmania)")
-ax4.set_title("Brecha tecnológica relativa (proxy: relación de poblaciones)")
-ax4.set_xticks([-10000, -5000, -1000, 0, 500, 1000, 1500])
-ax4.set_xticklabels(["-10K", "-5K", "-1K", "0", "500", "1K", "1500"], rotation=45)
-ax4.grid(True, which="both", ls="--", lw=0.5)
-st.pyplot(fig4)
-
-st.caption("💡 En ausencia de contacto, la región con mayor población inicial acumula ventaja tecnológica mucho más rápido. "
-          "Esto explica por qué Tasmania perdió tecnologías básicas, mientras el Viejo Mundo desarrolló civilizaciones complejas.")
-
-with st.expander("ℹ️ grafica entre poblaciones y tecnologia"):
-    st.image("assets/ragiones.jpg", caption="Figura 5. Tecnologia y cantidad de poblaciones por regiones", width=600)
\ No newline at end of file
+@st.cache_resource
+def stochastic_sweep_chart():
+    def build(ax):
+        ax.set_xscale("log")
+        ax.set_ylim(-0.05, 1.05)
+        ax.set_xlabel("Población inicial (millones, escala log)")
+        ax.set_ylabel("Probabilidad en 1500")
+        ax.set_title("Pérdida de tecnología y extinción según la población inicial")
+        ax.grid(True, which="both", ls="--", lw=0.5)
+
+    chart = ChartTemplate((8, 4), build)
+    chart.add_line("tech_loss", 'o-', color="purple", label="Menos técnicas que al inicio")
+    chart.add_line("extinct", 's--', color="black", label="Extinción (< 100 personas o sin técnicas)")
+    return chart
+
+
+@profiled("gráfico: barrido estocástico")
+@st.cache_data(max_entries=FIG_CACHE_ENTRIES, show_spinner=False)
+@persistent
+def render_stochastic_sweep(extinct, tech_loss):
+    return stochastic_sweep_chart().render({
+        "tech_loss": (SWEEP_P0_MILLIONS, tech_loss),
+        "extinct": (SWEEP_P0_MILLIONS, extinct),
+    })
+
+
+def build_regions_graph():
+    graph = SeriesGraph()
+    for name in ("g", "alpha", "P0_old_millions", "P0_tas_millions"):
+        graph.source(name)
+    graph.node("regions", ["g", "alpha", "P0_old_millions", "P0_tas_millions"], run_isolated_regions)
+    graph.node("ratio", ["regions"],
+               lambda regions: np.divide(regions[0], regions[1], out=np.ones_like(regions[0]), where=regions[1] != 0))
+    return graph
+
+
+@st.fragment
+def regions_section(g, alpha):
+    # === Sección comparativa: Regiones aisladas ===
+    st.subheader("🌍 Comparación entre regiones aisladas (sin contacto tecnológico)")
+    with st.expander("ℹ️ ¿Qué muestra esta simulación?"):
+        st.markdown("""
+        **Contexto histórico (Kremer, 1993, Sección IV.B):**  
+        Hasta 1500, regiones como Tasmania, las Américas y el Viejo Mundo estuvieron aisladas.  
+        El modelo predice que **la región con mayor población inicial generará más innovación** (más inventores), lo que lleva a:
+        - Mayor crecimiento poblacional.
+        - Mayor densidad tecnológica (aquí proxieda por la población misma).
+
+        **En esta simulación:**  
+        - Ambas regiones usan los mismos parámetros (`g`, `α`).  
+        - Solo difieren en su **población inicial**.  
+        - No hay intercambio de ideas (tecnología no se difunde).  
+        - Observamos cómo pequeñas diferencias iniciales se amplifican con el tiempo.
+
+        **Ejemplo real:**  
+        - Viejo Mundo (1500): ~407 millones → civilizaciones avanzadas.  
+        - Tasmania (1500): ~1,200–5,000 personas → perdió tecnologías como hacer fuego.
+        """)
+    with st.expander("ℹ️ Evidencia II"):
+        st.image("assets/regiones.png", caption="Figura 4. Hace 12.000 años, el derretimiento de los hielos creó cuatro laboratorios aislados. Sin contacto hasta 1500 d.C.", width=680)
+
+    st.write("Simulamos dos sociedades independientes desde **10,000 A.C. hasta 1500 D.C.**")
+
+    col3, col4 = st.columns(2)
+    with col3:
+        P0_old_millions = st.number_input(
+            "Población inicial: Viejo Mundo (millones)",
+            min_value=1.0,
+            max_value=1000.0,
+            value=st.session_state["P0_old_input"],
+            step=10.0,
+            key="P0_old_input"
+        )
+    with col4:
+        P0_tas_millions = st.number_input(
+            "Población inicial: Tasmania (millones)",
+            min_value=0.001,
+            max_value=10.0,
+            value=st.session_state["P0_tas_input"],
+            step=0.001,
+            format="%.3f",
+            key="P0_tas_input"
+        )
+
+    regions = session_graph("regions_graph", build_regions_graph).set(
+        g=g, alpha=alpha, P0_old_millions=P0_old_millions, P0_tas_millions=P0_tas_millions
+    )
+    st.image(render_isolated_regions(*regions["regions"], P0_old_millions, P0_tas_millions))
+    st.image(render_technology_gap(regions["ratio"]))
+    P_old, P_tas = regions["regions"]
+    download_series("Datos de las regiones", {"P_old": (years_iso, P_old), "P_tas": (years_iso, P_tas),
+                                              "ratio": (years_iso, regions["ratio"])},
+                    "kremer_regiones", "download_regions")
+
+    st.caption("💡 En ausencia de contacto, la región con mayor población inicial acumula ventaja tecnológica mucho más rápido. "
+              "Esto explica por qué Tasmania perdió tecnologías básicas, mientras el Viejo Mundo desarrolló civilizaciones complejas.")
+
+    with st.expander("ℹ️ grafica entre poblaciones y tecnologia"):
+        st.image("assets/ragiones.jpg", caption="Figura 5. Tecnologia y cantidad de poblaciones por regiones", width=600)
+
+    with st.expander("🎲 Modo estocástico: innovaciones al azar y pérdida de tecnología"):
+        st.markdown("""
+        En poblaciones pequeñas el azar importa: las innovaciones llegan como **eventos de Poisson** a una tasa
+        proporcional a la población, y cada técnica conocida puede **olvidarse** a una tasa que es alta cuando hay
+        pocos aprendices y despreciable en poblaciones grandes (Henrich, 2004). Cada técnica ganada o perdida
+        sube o baja la población malthusiana que la tecnología sostiene, y alrededor de ese nivel la población
+        fluctúa por nacimientos y muertes al azar, con más fuerza cuanto menor es. Una réplica se **extingue**
+        si baja de 100 personas o pierde todas sus técnicas. En promedio, y con técnicas pequeñas, se recupera
+        el modelo determinista.
+        """)
+        stochastic_on = st.checkbox("Simular réplicas estocásticas", False, key="stochastic_on")
+        s1, s2, s3 = st.columns(3)
+        replicas = s1.select_slider("Réplicas por región", options=[1_000, 10_000], value=1_000, key="stochastic_replicas")
+        loss_rate = s2.select_slider("Tasa de olvido por técnica (por año)", options=[1e-5, 3e-5, 1e-4, 3e-4, 1e-3],
+                                     value=1e-4, format_func=lambda v: f"{v:g}", key="stochastic_loss_rate")
+        loss_scale = s3.number_input("Población a la que el olvido se reduce a la mitad (miles)",
+                                     min_value=0.1, max_value=1000.0, value=10.0, step=1.0, key="stochastic_loss_scale")
+        if stochastic_on:
+            with st.spinner(f"Integrando {2 * replicas:,} réplicas..."):
+                stochastic = run_stochastic_regions(g, alpha, P0_old_millions, P0_tas_millions, replicas,
+                                                    loss_rate, loss_scale)
+            st.image(render_stochastic_regions(stochastic["years"], stochastic["bands"]))
+            m1, m2, m3, m4 = st.columns(4)
+            m1.metric("Viejo Mundo: pierde técnicas", f"{stochastic['tech_loss'][0]:.1%}")
+            m2.metric("Viejo Mundo: extinción", f"{stochastic['extinct'][0, -1]:.1%}")
+            m3.metric("Tasmania: pierde técnicas", f"{stochastic['tech_loss'][1]:.1%}")
+            m4.metric("Tasmania: extinción", f"{stochastic['extinct'][1, -1]:.1%}")
+            st.caption(f"Por réplica, en promedio: Viejo Mundo {stochastic['mean_innovations'][0]:,.1f} innovaciones y "
+                       f"{stochastic['mean_losses'][0]:,.1f} olvidos; Tasmania {stochastic['mean_innovations'][1]:,.1f} "
+                       f"y {stochastic['mean_losses'][1]:,.1f}.")
+
+            with st.spinner("Barriendo la población inicial..."):
+                sweep_extinct, sweep_loss = run_stochastic_sweep(g, alpha, loss_rate, loss_scale)
+            st.image(render_stochastic_sweep(sweep_extinct, sweep_loss))
+            st.caption(f"{SWEEP_REPLICAS:,} réplicas por población inicial, de 10,000 A.C. a 1500 D.C.")
+
+
+regions_section(g, alpha)
+stage("regiones")
+
+# === Panel de perfilado ===
+# Refleja la última ejecución completa del script: las que rehacen solo un
+# fragmento (sección global o regiones) no lo actualizan
+if profiler is not None:
+    with st.sidebar.expander("⏱️ Tiempos de esta ejecución", expanded=True):
+        st.metric("Total", f"{profiler.total_ms():.1f} ms")
+        st.markdown("**Etapas**")
+        st.table({
+            "Etapa": [r["name"] for r in profiler.stages()],
+            "ms": [f"{r['duration_ms']:.1f}" for r in profiler.stages()],
+        })
+        spans = profiler.spans()
+        if spans:
+            st.markdown("**Tramos** (sangría = anidamiento; un tramo que cuesta ~0 ms salió de caché)")
+            st.table({
+                "Tramo": ["\u2003" * r["depth"] + r["name"] for r in spans],
+                "ms": [f"{r['duration_ms']:.1f}" for r in spans],
+            })
+        records = profiler.to_jsonl(page="kremer_sim", engine=engine_mode, g=g, alpha=alpha)
+        st.download_button("Descargar JSONL", records, file_name="kremer_profile.jsonl", mime="application/jsonl")
+        # Con KREMER_PROFILE_LOG, cada ejecución perfilada se agrega a ese archivo
+        log_path = os.environ.get("KREMER_PROFILE_LOG")
+        if log_path:
+            with open(log_path, "a", encoding="utf-8") as log_file:
+                log_file.write(records)
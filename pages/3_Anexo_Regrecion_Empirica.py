@@ -1,7 +1,10 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+
+from kremer.breaks import multiple_breaks, scan_break
+from kremer.data import table_i_frame
+from kremer.plots import new_figure
+from kremer.regression import bootstrap_ols, ols, rolling_ols
 
 st.title("Anexo 3: Evidencia empírica del modelo de Kremer (1993)")
 
@@ -10,26 +13,8 @@ Este anexo presenta los datos históricos y la evidencia empírica central del p
 tal como aparecen en la **Tabla I** y la **Figura I** del artículo.
 """)
 
-# Datos históricos del paper (Tabla I)
-data = {
-    "Year": [-1_000_000, -300_000, -25_000, -10_000, -5000, -4000, -3000, -2000, -1000,
-             -500, -200, 1, 200, 400, 600, 800, 1000, 1100, 1200, 1300, 1400, 1500,
-             1600, 1650, 1700, 1750, 1800, 1850, 1875, 1900, 1920, 1930, 1940, 1950,
-             1960, 1970, 1980, 1990],
-    "Pop_millions": [0.125, 1, 3.34, 4, 5, 7, 14, 27, 50, 100, 150, 170, 190, 190, 200,
-                     220, 265, 320, 360, 360, 350, 425, 545, 545, 610, 720, 900,
-                     1200, 1325, 1625, 1813, 1987, 2213, 2516, 3019, 3693, 4450, 5333]
-}
-df_hist = pd.DataFrame(data)
-df_hist["Pop"] = df_hist["Pop_millions"] / 1000  # en billones
-
-# Calcular tasas de crecimiento anual
-df_hist["Growth_rate"] = np.nan
-for i in range(len(df_hist) - 1):
-    dt = df_hist["Year"].iloc[i+1] - df_hist["Year"].iloc[i]
-    if dt > 0:
-        gr = (np.log(df_hist["Pop"].iloc[i+1]) - np.log(df_hist["Pop"].iloc[i])) / dt
-        df_hist.loc[i, "Growth_rate"] = gr
+# Datos históricos del paper (Tabla I), con la tasa de crecimiento anual ya calculada
+df_hist = table_i_frame()
 
 st.header("1. Datos históricos de población mundial")
 
@@ -46,7 +31,10 @@ st.caption("Fuente: Kremer (1993), Tabla I. Datos compilados de McEvedy & Jones
 
 st.header("2. Figura I del paper: Tasa de crecimiento vs. nivel de población")
 
-fig, ax = plt.subplots(figsize=(8, 5))
+intercept = st.checkbox("Incluir intercepto (el paper estima sin intercepto)", False)
+
+fig = new_figure((8, 5))
+ax = fig.add_subplot()
 ax.scatter(
     df_hist["Pop"][:-1],
     df_hist["Growth_rate"][:-1],
@@ -61,10 +49,16 @@ y = df_hist["Growth_rate"][:-1].values
 valid = (X > 0) & np.isfinite(y)
 X = X[valid]
 y = y[valid]
+years_fit = df_hist["Year"][:-1].values[valid]
 
-# Regresión sin intercepto: y = beta * x
-beta = np.sum(X * y) / np.sum(X**2)
-ax.plot(X, beta * X, color="red", label=f"Regresión: GRPOP = {beta:.3f} · POP")
+fit = ols(X, y, intercept=intercept)
+beta = fit["beta"][-1]
+X_line = np.sort(X)
+if intercept:
+    ax.plot(X_line, fit["beta"][0] + beta * X_line, color="red",
+            label=f"Regresión: GRPOP = {fit['beta'][0]:.4f} + {beta:.3f} · POP")
+else:
+    ax.plot(X_line, beta * X_line, color="red", label=f"Regresión: GRPOP = {beta:.3f} · POP")
 
 ax.set_xlabel("Población (billones)")
 ax.set_ylabel("Tasa de crecimiento anual")
@@ -88,6 +82,52 @@ $$
 > — Kremer (1993, p. 682)
 """)
 
+st.subheader("Incertidumbre de β")
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def run_bootstrap(X, y, intercept, n_boot, block_length):
+    return bootstrap_ols(X, y, n_boot=n_boot, intercept=intercept, block_length=block_length)
+
+
+b1, b2 = st.columns(2)
+with b1:
+    n_boot = st.select_slider("Remuestreos bootstrap", options=[1_000, 10_000, 100_000], value=10_000)
+with b2:
+    block_length = st.slider("Largo de bloque (1 = bootstrap de pares)", 1, 8, 1,
+                             help="Bloques más largos conservan la autocorrelación de la serie.")
+boot = run_bootstrap(X, y, intercept, n_boot, block_length)
+
+m1, m2, m3 = st.columns(3)
+m1.metric("β estimado", f"{beta:.5f}")
+m2.metric("Error estándar (HAC)", f"{fit['se_hac'][-1]:.5f}", help=f"Clásico: {fit['se'][-1]:.5f}")
+m3.metric("IC 95 % (bootstrap)", f"[{boot['low'][-1]:.4f}, {boot['high'][-1]:.4f}]")
+st.caption(f"n = {fit['n']} observaciones, R² = {fit['r2']:.3f}"
+           f"{'' if intercept else ' (no centrado)'}. Errores HAC de Newey-West con núcleo de Bartlett.")
+
+st.subheader("Estabilidad de β a lo largo de la historia")
+w1, w2 = st.columns(2)
+with w1:
+    expanding = st.checkbox("Ventana expansiva (desde el primer dato)", False)
+with w2:
+    window = st.slider("Observaciones por ventana", 4, len(X), 10, disabled=expanding)
+
+betas_rolling = rolling_ols(X, y, None if expanding else window, intercept=intercept)[:, -1]
+fig_roll = new_figure((8, 4))
+ax_roll = fig_roll.add_subplot()
+# Eje en orden de observación: los años de la Tabla I están muy desigualmente espaciados
+obs = np.arange(len(years_fit))
+ax_roll.plot(obs, betas_rolling, 'o-', color="purple", markersize=4, label="β por ventana")
+ax_roll.axhline(beta, color="red", linestyle="--", label="β con toda la muestra")
+ax_roll.set_xticks(obs[::3])
+ax_roll.set_xticklabels([f"{year:,}" for year in years_fit[::3]], rotation=45)
+ax_roll.set_xlabel("Año en que termina la ventana")
+ax_roll.set_ylabel("β")
+ax_roll.set_title("Estimación de β en ventanas " + ("expansivas" if expanding else "móviles"))
+ax_roll.legend()
+ax_roll.grid(True, ls="--", lw=0.5)
+st.pyplot(fig_roll)
+
 st.header("3. ¿Por qué falla después de 1950?")
 
 st.markdown("""
@@ -99,9 +139,66 @@ cuando el ingreso per cápita supera un umbral, comienza la **transición demogr
 rompiendo el ciclo malthusiano.
 """)
 
+st.subheader("Estimación del quiebre")
+st.markdown("""
+Se evalúan **todos** los años posibles de quiebre de la regresión GRPOP–POP y se elige el que maximiza el
+estadístico F de cambio de coeficientes (**sup-F**). Con varios quiebres, la partición óptima se obtiene por
+programación dinámica (Bai y Perron, 2003) y el número de quiebres se elige por BIC.
+""")
+
+q1, q2 = st.columns(2)
+with q1:
+    # Con la muestra corta de la Tabla I, un 5 % dejaría regímenes de unas 2 observaciones
+    trim = st.select_slider("Recorte en los extremos", options=[0.10, 0.15, 0.20], value=0.15,
+                            format_func=lambda t: f"{t:.0%}",
+                            help="Mínimo de observaciones por régimen, como fracción de la muestra. "
+                                 "Los valores críticos de Andrews solo están tabulados para el 15 %.")
+with q2:
+    max_breaks = st.slider("Máximo de quiebres", 1, 3, 2)
+
+scan = scan_break(X, y, intercept=intercept, trim=trim)
+k1, k2, k3 = st.columns(3)
+k1.metric("Quiebre estimado", f"{years_fit[scan['index']]:,}")
+k2.metric("sup-F", f"{scan['sup_f']:.2f}")
+if scan["critical"] is not None:
+    k3.metric("Valor crítico 5 % (Andrews)", f"{scan['critical'][0.05]:.2f}")
+else:
+    k3.metric("Observaciones por régimen", f"≥ {scan['candidates'][0]}")
+    st.warning("⚠️ Los valores críticos de Andrews que se informan corresponden a un recorte del 15 %: "
+               "con otro recorte el sup-F no tiene valor crítico de referencia.")
+
+fig_f = new_figure((8, 3.5))
+ax_f = fig_f.add_subplot()
+ax_f.plot(scan["candidates"], scan["f"], 'o-', color="darkgreen", markersize=4)
+ax_f.axvline(scan["index"], color="red", linestyle="--", label=f"Máximo: {years_fit[scan['index']]:,}")
+if scan["critical"] is not None:
+    ax_f.axhline(scan["critical"][0.05], color="gray", linestyle=":", label="Valor crítico 5 %")
+ax_f.set_xticks(scan["candidates"][::2])
+ax_f.set_xticklabels([f"{year:,}" for year in years_fit[scan["candidates"][::2]]], rotation=45)
+ax_f.set_xlabel("Primer año del nuevo régimen")
+ax_f.set_ylabel("Estadístico F")
+ax_f.legend()
+ax_f.grid(True, ls="--", lw=0.5)
+st.pyplot(fig_f)
+
+partitions = multiple_breaks(X, y, max_breaks=max_breaks, intercept=intercept, trim=trim)
+best = min(partitions, key=lambda result: result["bic"])
+edges = [0, *best["breaks"], len(X)]
+st.dataframe({
+    "Desde": [f"{years_fit[a]:,}" for a in edges[:-1]],
+    "Hasta": [f"{years_fit[b - 1]:,}" for b in edges[1:]],
+    "β del tramo": best["betas"][:, -1],
+})
+st.caption(f"BIC elige {len(best['breaks'])} quiebre(s) entre 0 y {len(partitions) - 1}. "
+           "Con recortes del 15 % o más, los pocos datos posteriores a 1950 no alcanzan para formar un régimen propio.")
+
 st.header("Referencia")
 
 st.markdown("""
 - Kremer, M. (1993). *Population Growth and Technological Change: One Million B.C. to 1990*.  
   **The Quarterly Journal of Economics**, 108(3), 681–716. (Tabla I, Figura I, Sección IV.A)
+- Andrews, D. W. K. (1993). *Tests for Parameter Instability and Structural Change with Unknown Change Point*.  
+  **Econometrica**, 61(4), 821–856.
+- Bai, J. y Perron, P. (2003). *Computation and Analysis of Multiple Structural Change Models*.  
+  **Journal of Applied Econometrics**, 18(1), 1–22.
 """)
\ No newline at end of file
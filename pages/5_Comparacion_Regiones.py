@@ -1,5 +1,9 @@
 import streamlit as st
-import matplotlib.pyplot as plt
+import numpy as np
+
+from kremer.plots import new_figure
+from kremer.regions import simulate_regions, uniform_contact
+from kremer.spatial import connected_components, downsample, land_neighbors, random_landmass, simulate_grid
 
 st.title("Comparación entre regiones aisladas (Kremer, 1993)")
 
@@ -15,7 +19,8 @@ pob_1500 = [407, 14, 0.2, 0.003]       # millones (usamos valor medio para Tasma
 densidad = [p * 1e6 / (a * 1e6) for p, a in zip(pob_1500, area_km2)]  # hab/km²
 
 # Gráfico de dispersión
-fig, ax = plt.subplots(figsize=(8, 5))
+fig = new_figure((8, 5))
+ax = fig.add_subplot()
 ax.scatter(area_km2, densidad, s=100, color="purple")
 for i, region in enumerate(regiones):
     ax.text(area_km2[i], densidad[i] + 0.01, region, fontsize=10, ha='center')
@@ -36,4 +41,113 @@ st.markdown("""
 
 > *"Among societies without technological contact, those with greater land area, and hence greater initial population, had faster technological change."*  
 > — Kremer (1993, p. 708)
-""")
\ No newline at end of file
+""")
+
+st.header("Simulación de las cuatro regiones")
+
+st.markdown("""
+Integramos las cuatro regiones de la Tabla VII a la vez. Siguiendo el argumento de Kremer, la **población inicial
+es proporcional al área**: todas parten en 10,000 A.C. con la misma densidad. Opcionalmente, desde el año de contacto
+la tecnología se difunde entre regiones: cada una suma a sus propios inventores una fracción de los inventores de las demás.
+""")
+
+col1, col2 = st.columns(2)
+with col1:
+    g = st.slider("Productividad de investigación (g)", min_value=0.001, max_value=0.02, value=0.005, step=0.001)
+    alpha = st.slider("Parámetro α (elasticidad tierra)", min_value=0.5, max_value=0.9, value=0.7, step=0.05)
+    density0 = st.number_input("Densidad inicial en 10,000 A.C. (hab/km²)", min_value=0.001, max_value=1.0,
+                               value=0.04, step=0.01, format="%.3f")
+with col2:
+    with_contact = st.checkbox("Activar contacto tecnológico", False)
+    contact_year = st.slider("Año de contacto", min_value=0, max_value=1900, value=1500, step=50)
+    contact_strength = st.slider("Intensidad de difusión", min_value=0.0, max_value=1.0, value=0.1, step=0.05)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def run_table_vii(g, alpha, density0, with_contact, contact_year, contact_strength):
+    years = np.arange(-10000, 2000, 10)
+    P0 = density0 * np.array(area_km2) * 1e6 / 1e9  # en billones
+    contact = uniform_contact(len(area_km2), contact_strength) if with_contact else None
+    P, _ = simulate_regions(P0, g, alpha, years, contact=contact, contact_year=contact_year)
+    return years, P
+
+
+years_reg, P_reg = run_table_vii(g, alpha, density0, with_contact, contact_year, contact_strength)
+
+fig_reg = new_figure((8, 4))
+ax_reg = fig_reg.add_subplot()
+for region, P in zip(regiones, P_reg):
+    ax_reg.plot(years_reg, P, label=region)
+if with_contact:
+    ax_reg.axvline(x=contact_year, color="gray", linestyle="--", label="Contacto")
+ax_reg.set_yscale("log")
+ax_reg.set_xlabel("Año (negativo = A.C., positivo = D.C.)")
+ax_reg.set_ylabel("Población (billones, escala log)")
+ax_reg.set_title("Trayectorias simuladas de las regiones de la Tabla VII")
+ax_reg.legend()
+ax_reg.grid(True, which="both", ls="--", lw=0.5)
+st.pyplot(fig_reg)
+
+i_1500 = np.searchsorted(years_reg, 1500)
+# Un dict basta para st.dataframe: evita importar pandas al abrir la página
+density_format = st.column_config.NumberColumn(format="%.3f")
+st.dataframe({
+    "Región": regiones,
+    "Densidad observada 1500 (hab/km²)": densidad,
+    "Densidad simulada 1500 (hab/km²)": P_reg[:, i_1500] * 1e9 / (np.array(area_km2) * 1e6),
+}, column_config={"Densidad observada 1500 (hab/km²)": density_format,
+                  "Densidad simulada 1500 (hab/km²)": density_format})
+
+st.caption("💡 El modelo reproduce el orden de la Tabla VII: a mayor área, mayor población inicial y mayor densidad en 1500.")
+
+
+st.header("Simulación espacial: masas de tierra sobre una grilla")
+
+st.markdown("""
+Cada celda de tierra tiene su propia población. Las ideas viajan a las celdas vecinas y se **suman** al acervo
+de inventores de cada celda, pero no cruzan el mar: cada masa de tierra aislada es un laboratorio independiente.
+Al final comparamos, para cada masa de tierra, su **área** con su **densidad** (como en el gráfico de la Tabla VII).
+""")
+
+col5, col6 = st.columns(2)
+with col5:
+    grid_size = st.select_slider("Tamaño de la grilla (celdas por lado)", options=[128, 256, 512, 1024], value=256)
+    land_fraction = st.slider("Fracción de tierra", min_value=0.1, max_value=0.6, value=0.3, step=0.05)
+    map_seed = st.number_input("Semilla del mapa", min_value=0, value=0, step=1)
+with col6:
+    spread = st.slider("Difusión entre celdas vecinas", min_value=0.0, max_value=0.245, value=0.24, step=0.005)
+    cell_density = st.number_input("Población inicial por celda (millones)", min_value=0.01, max_value=1.0,
+                                   value=0.3, step=0.05, format="%.2f")
+
+if st.button("▶️ Simular grilla"):
+    land = random_landmass((grid_size, grid_size), land_fraction, smoothness=max(grid_size // 32, 2), seed=int(map_seed))
+    years_grid = np.arange(-10000, 2001, 50)
+    factor = max(grid_size // 128, 1)
+    from matplotlib import colormaps  # solo al simular la grilla
+
+    cmap = colormaps["viridis"]
+    log_range = (np.log10(cell_density / 1000), np.log10(cell_density / 1000) + 2)
+
+    placeholder = st.empty()
+    for year, raster, P_land in simulate_grid(land, cell_density / 1000, g, alpha, years_grid,
+                                      spread=spread, snapshot_every=20, factor=factor):
+        with np.errstate(divide="ignore"):
+            level = (np.log10(raster) - log_range[0]) / (log_range[1] - log_range[0])
+        rgb = cmap(np.clip(level, 0, 1))[..., :3]
+        rgb[downsample(land.astype(float), factor) == 0] = (0.85, 0.92, 1.0)
+        placeholder.image(rgb, caption=f"Población por celda (escala log), año {int(year)}", width=512)
+
+    labels = connected_components(land_neighbors(land))
+    cells = np.bincount(labels)
+    pop = np.bincount(labels, weights=P_land)
+
+    fig_grid = new_figure((8, 5))
+    ax_grid = fig_grid.add_subplot()
+    ax_grid.scatter(cells, pop / cells, s=10, color="purple", alpha=0.6)
+    ax_grid.set_xscale("log")
+    ax_grid.set_yscale("log")
+    ax_grid.set_xlabel("Área de la masa de tierra (celdas, escala log)")
+    ax_grid.set_ylabel(f"Densidad en {years_grid[-1]} (billones por celda, escala log)")
+    ax_grid.set_title(f"Área vs. densidad en {cells.size} masas de tierra simuladas")
+    ax_grid.grid(True, which="both", ls="--", lw=0.5)
+    st.pyplot(fig_grid)
@@ -0,0 +1,16 @@
+import numpy as np
+
+from kremer.stochastic import simulate_stochastic
+
+YEARS = np.arange(-10_000, -9_000, 1.0)
+
+
+def test_small_population_can_go_extinct():
+    # 150 personas: el ruido demográfico basta para bajar de 100 en algunas réplicas
+    result = simulate_stochastic(1.5e-7, 0.004, 0.7, YEARS, replicas=1_000, seed=1)
+    assert 0 < result["extinct"][0, -1] < 1
+
+
+def test_large_population_survives():
+    result = simulate_stochastic(1.0, 0.004, 0.7, YEARS, replicas=1_000, seed=1)
+    assert result["extinct"][0, -1] == 0